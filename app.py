@@ -1,51 +1,81 @@
 # pylint: disable=E1120
-import streamlit as st
+from mastermind.dashboard import profiling
+with profiling.timed('import streamlit'):
+    import streamlit as st
 import itertools
-import plotly.graph_objects as go
-from mastermind.core.mastermind import MasterMind
-from mastermind.dashboard.session_state import _get_state
-from mastermind.dashboard.st_rerun import rerun
-from textwrap import dedent
-from typing import Callable
+with profiling.timed('import mastermind'):
+    from mastermind.core import instrumentation
+    from mastermind.core.analytics import MAX_ANALYTICS_CANDIDATES
+    from mastermind.core.mastermind import MasterMind
+    from mastermind.core.registry import GameRegistry, game_factory
+    from mastermind.core.scoring import VARIANTS
+    from mastermind.core.strategies import STRATEGIES
+    from mastermind.dashboard.session_state import _get_session_id, _get_state
+    from mastermind.dashboard.st_rerun import rerun
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
 
 pink_st = '#f63366'
 black_st = '#262730'
 gray_st = '#f5f6f8'
 
 @st.cache(allow_output_mutation=True)
-def new_game(N_SLOTS: int, N_COLORS: int) -> MasterMind:
+def game_registry(strategy: str = 'random') -> GameRegistry:
+    """Games of every session played by the agent with the given strategy, shared by the whole server (cached)
+
+    Args:
+        strategy (str, optional): agent guess strategy, whose opening books are followed when built. Defaults to 'random'.
+
+    Returns:
+        GameRegistry: game registry
+    """
+    return GameRegistry(factory=game_factory(strategy, hooks=metrics_hooks()))
+
+@st.cache(allow_output_mutation=True)
+def metrics_hooks() -> list:
+    """Instrumentation sinks configured through MASTERMIND_METRICS (cached)
+
+    Returns:
+        list: hooks receiving the events of every game
     """
+    return instrumentation.sinks_from_env()
+
+def new_game(N_SLOTS: int, N_COLORS: int, variant: str = 'classic', strategy: str = 'random') -> MasterMind:
+    """Game of the current session
 
     Args:
         N_SLOTS (int): length of code
         N_COLORS (int): number of distinct colors available
+        variant (str, optional): game variant. Defaults to 'classic'.
+        strategy (str, optional): agent guess strategy. Defaults to 'random'.
 
     Returns:
         MasterMind: mastermind game instance
     """
-    return MasterMind(N_SLOTS=N_SLOTS, N_COLORS=N_COLORS)
+    return game_registry(strategy).get(_get_session_id(), N_SLOTS, N_COLORS, variant)
 
-@st.cache(allow_output_mutation=True)
 def new_session() -> Callable:
-    """Generate a new streamlit session (cached)
+    """Get the state of the current streamlit session, initialized on first run
 
     Returns:
         Callable: state function
     """
     state = _get_state()
-    state.name = ''
-    state.code_submitted = False
+    state(name='', code_submitted=False)
     return state
 
 def reset_game() -> None:
-    """Reset game
+    """Reset the games of the current session only, whatever the agent strategy
     """
-    st.caching.clear_cache()
+    for strategy in STRATEGIES:
+        game_registry(strategy).reset(_get_session_id())
     rerun()
 
 @st.cache
-def odds_gauge(value: float) -> go.Figure:
-    """Implements a gauge to display winning chances on next turn
+def odds_gauge(value: float) -> 'go.Figure':
+    """Implements a gauge to display winning chances on next turn (plotly is only imported here, on first draw)
 
     Args:
         value (float): Winning odds
@@ -53,6 +83,7 @@ def odds_gauge(value: float) -> go.Figure:
     Returns:
         go.Figure: Gauge charts
     """
+    go = profiling.lazy_import('plotly.graph_objects')
     fig = go.Figure(
         go.Indicator(
             mode = "gauge+number",
@@ -69,6 +100,37 @@ def odds_gauge(value: float) -> go.Figure:
     fig.update_layout(height=250, paper_bgcolor = gray_st, font = {'color': black_st})
     return fig
 
+@st.cache
+def turns_chart(distribution: tuple) -> 'go.Figure':
+    """Implements a bar chart of the turns left to solve the game with minimax play
+
+    Args:
+        distribution (tuple): number of secrets solved in exactly k more turns, for each k
+
+    Returns:
+        go.Figure: Bar chart
+    """
+    go = profiling.lazy_import('plotly.graph_objects')
+    total = sum(distribution)
+    expected = sum(k*n for k, n in enumerate(distribution))/total
+    fig = go.Figure(
+        go.Bar(
+            x=list(range(1, len(distribution))),
+            y=[100*n/total for n in distribution[1:]],
+            marker=dict(color=pink_st)
+            )
+    )
+    fig.update_layout(
+        title=dict(text=f"Turns left: {expected:.2f} expected", font=dict(size=16)),
+        xaxis=dict(title='turns', dtick=1),
+        yaxis=dict(ticksuffix='%'),
+        height=250,
+        paper_bgcolor=gray_st,
+        plot_bgcolor=gray_st,
+        font={'color': black_st}
+        )
+    return fig
+
 def main() -> None:
     """Implements streamlit app to play with MasterMind
     """
@@ -138,16 +200,34 @@ def main() -> None:
         key='locations'
         )
     new_line = '<br><br>' if locations >= 5 else ''
+    variant = st.sidebar.selectbox(
+        'Variant',
+        list(VARIANTS),
+        format_func=lambda x: x.replace('_', ' ').title(),
+        key='variant'
+        )
     colors = st.sidebar.slider(
         'Number of colors',
-        min_value=2,
+        # codes without repeated colors need at least one color per slot
+        min_value=2 if VARIANTS[variant].repeats else locations,
         max_value=6,
         value=6,
         step=1,
         key='colors'
         )
+    # the agent only guesses the code of the user playing as CodeMaker
+    strategy = st.sidebar.selectbox(
+        'Agent strategy',
+        list(STRATEGIES),
+        format_func=lambda x: x.replace('_', ' ').title(),
+        key='strategy'
+        ) if user_role == 'code_maker' else 'random'
 
-    game = new_game(N_SLOTS=locations, N_COLORS=colors)
+    with profiling.timed('new game'):
+        game = new_game(N_SLOTS=locations, N_COLORS=colors, variant=variant, strategy=strategy)
+    if game.user_code is None:
+        # the registry may have replaced the game (expiry, eviction, new board), whose secret code is then to be submitted again
+        session.code_submitted = False
 
     with st.beta_expander("Show game rules"):
         st.markdown(f'''
@@ -159,13 +239,17 @@ def main() -> None:
     secret_code.markdown(f"# Secret code: {''.join(game.N_SLOTS*[game.secret])}")
     winning_odds = st.sidebar.empty()
     winning_odds.plotly_chart(odds_gauge(100*game.calculate_win_odds()), use_container_width=True)
+    # filled once the submissions of this run are handled, subtrees are memoized across reruns
+    turns_left = st.sidebar.empty()
 
     empty_md = st.sidebar.empty()
     empty_hint = st.sidebar.empty()
     empty_submit = st.sidebar.empty()
+    # codes left by each hint to the agent guess, filled once the submissions of this run are handled
+    empty_counts = st.sidebar.empty()
 
-    for log in game.history:
-        st.markdown(log, unsafe_allow_html=True)
+    # turns are rendered in one block, once the submissions of this run are handled
+    history = st.empty()
 
     if not session.code_submitted:
         st.sidebar.markdown('# Code selection')
@@ -179,6 +263,9 @@ def main() -> None:
             ]
         code = tuple(game.inv_dict.get(i) for c in selection for i in c)
         submit_code = st.sidebar.button('Submit code')
+        if submit_code and code not in game.space:
+            st.sidebar.error('Each color can be used only once in this variant!')
+            submit_code = False
     else:
         code = game.user_code
         submit_code = False
@@ -186,20 +273,13 @@ def main() -> None:
     if user_role == 'code_breaker':
         if submit_code:
             game.user_guess(code)
-            st.markdown(game.history[-1], unsafe_allow_html=True)
-            game.memory = game.memory.union(
-                    set(
-                        filter(
-                            lambda guess: game.get_hint(guess, versus=game.turns[-1]) != game.get_hint(code),
-                            list(game.complement(game.memory))
-                            )
-                        )
-                    )
+            game.apply_feedback(code, game.get_hint(code))
             winning_odds.plotly_chart(odds_gauge(100*game.calculate_win_odds()), use_container_width=True)
             if game.success:
                 st.balloons()
                 secret_code.markdown(f"# Secret code: {new_line}{game.paint(game.secret_code)}", unsafe_allow_html=True)
-                st.caching.clear_cache()
+                session.code_submitted = False
+                game_registry(strategy).reset(_get_session_id())
 
     elif user_role == 'code_maker':
 
@@ -207,7 +287,6 @@ def main() -> None:
             session.code_submitted = True
             game.user_code = code
             game.agent_guess()
-            st.markdown(game.history[-1], unsafe_allow_html=True)
 
         if session.code_submitted:
             game.secret_code = code
@@ -220,34 +299,30 @@ def main() -> None:
             )
             submit_hint = empty_submit.button('Submit hint')
             if submit_hint:
-
-                if game.translate_hint(hint) == (locations, 0):
+                feedback = game.translate_hint(hint)
+                if not game.is_coherent(feedback):
+                    st.error("How dare you! _This hint is incoherent..._ No code would get it, please check it again!")
+                elif feedback == (locations, 0):
                     game.success = True
-
-                if game.success:
                     st.balloons()
-                    st.caching.clear_cache()
+                    # the next run starts a new game, waiting for a new secret code
+                    session.code_submitted = False
+                    game_registry(strategy).reset(_get_session_id())
                 else:
-                    game.history[-1] += (
-                        dedent(f'''
-                        ## _Hint_: {''.join(hint)}
-                        ---
-                        ''')
-                        )
-                    game.memory = game.memory.union(
-                    set(
-                        filter(
-                            lambda code: game.get_hint(code, versus=game.turns[-1]) != game.translate_hint(hint),
-                            list(game.complement(game.memory))
-                            )
-                        )
-                    )
-                    try:
-                        game.agent_guess()
-                    except IndexError:
-                        st.error("How dare you! _Hints are incoherent..._ Please reset game, I'm too confused to handle this!")
+                    game.apply_feedback(game.last_guess, feedback)
+                    game.agent_guess()
                     winning_odds.plotly_chart(odds_gauge(100*game.calculate_win_odds()), use_container_width=True)
-                    st.markdown(game.history[-1], unsafe_allow_html=True)
+
+    history.markdown(game.render_history(), unsafe_allow_html=True)
+    partition = game.hint_partition() if user_role == 'code_maker' and not game.success else None
+    if partition is not None:
+        # scored once per agent guess, the same hints then prune the candidates
+        empty_counts.markdown('<br>'.join(
+            f"{''.join(x) if x else 'No match'}: {partition.counts[game.space.encode_hint(*game.translate_hint(''.join(x)))]} codes left"
+            for x in game.possible_hints
+            ), unsafe_allow_html=True)
+    if not game.success and 0 < game.n_candidates <= MAX_ANALYTICS_CANDIDATES:
+        turns_left.plotly_chart(turns_chart(tuple(game.turn_distribution().tolist())), use_container_width=True)
 
     repo = '💻 [GitHub repo](https://github.com/a-slice-of-py/mastermind)'
     linkedin = '💼 [Linkedin profile](https://it.linkedin.com/in/silviolugaro)'
@@ -257,7 +332,13 @@ def main() -> None:
     st.sidebar.markdown(linkedin, unsafe_allow_html=True)
     st.sidebar.markdown(contact, unsafe_allow_html=True)
 
-    session.sync()
+    game_registry(strategy).touch(_get_session_id(), locations, colors, variant)
+    profiling.first_render()
+    if profiling.enabled():
+        st.sidebar.caption(f'Startup: {profiling.report()}')
+
+    with instrumentation.span(metrics_hooks(), 'session_sync', game.space.key, game.trials):
+        session.sync()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
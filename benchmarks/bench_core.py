@@ -0,0 +1,195 @@
+"""Benchmark suite for the core engine hot paths.
+
+Times MasterMind construction, get_hint, make_code, calculate_win_odds and apply_feedback over the
+dashboard slider ranges (2-6 slots, 2-6 colors), a few larger stress boards and full simulated
+games per strategy, recording wall time, tracemalloc allocations and peak RSS as JSON.
+
+Usage:
+    python benchmarks/bench_core.py --output head.json
+    python benchmarks/bench_core.py --compare base.json head.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import resource
+import subprocess
+import tracemalloc
+from typing import Callable, Optional
+
+import numpy as np
+
+from mastermind.core.mastermind import MasterMind
+from mastermind.core.simulation import simulate
+from mastermind.core.strategies import STRATEGIES
+
+SLIDER_BOARDS = [(slots, colors) for slots in range(2, 7) for colors in range(2, 7)]
+STRESS_BOARDS = [(6, 8), (7, 8), (8, 10)]
+GAME_BOARDS = [(4, 6), (5, 6)]
+
+
+def peak_rss() -> int:
+    """Peak resident set size of the process, in bytes."""
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss*1024
+
+
+def measure(fn: Callable[[], object], repeat: int = 5, number: int = 1) -> dict:
+    """Time a callable and trace its allocations.
+
+    Args:
+        fn (Callable[[], object]): operation to be measured
+        repeat (int, optional): number of timed rounds, the best one is kept. Defaults to 5.
+        number (int, optional): calls per round. Defaults to 1.
+
+    Returns:
+        dict: seconds per call, allocated bytes (peak and net, over one call) and peak RSS
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start)/number)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    fn()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return dict(seconds=best, alloc_peak=peak - before, alloc_net=current - before, rss_peak=peak_rss())
+
+
+def played_game(N_SLOTS: int, N_COLORS: int, seed: int = 0) -> MasterMind:
+    """A game with one scored turn, as left by the dashboard."""
+    game = MasterMind(N_SLOTS, N_COLORS, rng=seed)
+    code = game.make_code()
+    if code == game.secret_code:
+        code = game.omega[(game.space.index(code) + 1) % len(game.omega)]
+    game.user_guess(code)
+    game.apply_feedback(code, game.get_hint(code))
+    return game
+
+
+def bench_board(N_SLOTS: int, N_COLORS: int, stress: bool = False) -> list:
+    """Benchmark the per-turn operations of one board."""
+    board = f'{N_SLOTS}x{N_COLORS}'
+    rng = random.Random(0)
+    repeat = 1 if stress else 5
+    results = []
+
+    def record(name: str, fn: Callable[[], object], **kwargs) -> None:
+        results.append(dict(name=name, board=board, **measure(fn, **kwargs)))
+
+    record('init', lambda: MasterMind(N_SLOTS, N_COLORS, rng=0), repeat=repeat, number=10)
+    game = MasterMind(N_SLOTS, N_COLORS, rng=0)
+    codes = [game.omega[rng.randrange(len(game.omega))] for _ in range(2)]
+    record('get_hint', lambda: game.get_hint(*codes), repeat=repeat, number=100)
+    record('make_code', game.make_code, repeat=repeat, number=10)
+    record('calculate_win_odds', game.calculate_win_odds, repeat=repeat, number=1000)
+
+    def apply_feedback() -> None:
+        fresh = MasterMind(N_SLOTS, N_COLORS, rng=0)
+        fresh.apply_feedback(codes[0], fresh.get_hint(codes[0]))
+
+    record('apply_feedback_first', apply_feedback, repeat=repeat)
+    if not stress:
+        played = played_game(N_SLOTS, N_COLORS)
+        record('make_code_after_feedback', played.make_code, repeat=repeat, number=10)
+    return results
+
+
+def bench_games(N_SLOTS: int, N_COLORS: int, n_games: int) -> list:
+    """Benchmark full simulated games, for each strategy."""
+    results = []
+    for name in sorted(STRATEGIES):
+        report = None
+
+        def run() -> None:
+            nonlocal report
+            report = simulate(N_SLOTS, N_COLORS, n_games, name, rng=0, trace_memory=False)
+
+        result = measure(run, repeat=1)
+        results.append(dict(
+            name=f'games_{name}',
+            board=f'{N_SLOTS}x{N_COLORS}',
+            games=n_games,
+            mean_turns=float(report.turns.mean()),
+            **result
+            ))
+    return results
+
+
+def metadata() -> dict:
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+            ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return dict(
+        commit=commit,
+        python=platform.python_version(),
+        numpy=np.__version__,
+        platform=platform.platform(),
+        cache=os.environ.get('MASTERMIND_CACHE_DIR'),
+        )
+
+
+def compare(base_path: str, head_path: str, threshold: float) -> int:
+    """Print timings of two runs side by side, returning the number of regressions."""
+    with open(base_path) as f:
+        base = {(r['name'], r['board']): r for r in json.load(f)['results']}
+    with open(head_path) as f:
+        head = {(r['name'], r['board']): r for r in json.load(f)['results']}
+    regressions = 0
+    print(f"{'benchmark':<32}{'board':>8}{'base':>12}{'head':>12}{'ratio':>8}")
+    for key in sorted(base.keys() & head.keys()):
+        ratio = head[key]['seconds']/base[key]['seconds'] if base[key]['seconds'] else float('inf')
+        flag = ''
+        if ratio > 1 + threshold:
+            regressions += 1
+            flag = '  <-- slower'
+        print(f"{key[0]:<32}{key[1]:>8}{base[key]['seconds']:>12.3g}{head[key]['seconds']:>12.3g}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main(argv: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the MasterMind core engine.')
+    parser.add_argument('--output', default=None, help='JSON file to write results to (stdout by default)')
+    parser.add_argument('--quick', action='store_true', help='only the default 4x6 board, no stress boards')
+    parser.add_argument('--no-stress', action='store_true', help='skip the stress boards')
+    parser.add_argument('--games', type=int, default=200, help='simulated games per strategy and board')
+    parser.add_argument('--no-cache', action='store_true', help='disable the persistent score table cache')
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'HEAD'), help='compare two result files')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative slowdown reported as regression')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return 1 if compare(*args.compare, args.threshold) else 0
+    if args.no_cache:
+        os.environ['MASTERMIND_CACHE_DIR'] = ''
+
+    results = []
+    boards = [(4, 6)] if args.quick else SLIDER_BOARDS
+    for N_SLOTS, N_COLORS in boards:
+        results.extend(bench_board(N_SLOTS, N_COLORS))
+    if not (args.quick or args.no_stress):
+        for N_SLOTS, N_COLORS in STRESS_BOARDS:
+            results.extend(bench_board(N_SLOTS, N_COLORS, stress=True))
+    for N_SLOTS, N_COLORS in ([(4, 6)] if args.quick else GAME_BOARDS):
+        results.extend(bench_games(N_SLOTS, N_COLORS, args.games))
+
+    report = json.dumps(dict(meta=metadata(), results=results), indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report)
+    else:
+        print(report)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
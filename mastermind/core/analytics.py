@@ -0,0 +1,124 @@
+import random
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Optional, Sequence, Union
+
+import numpy as np
+
+from mastermind.core.scoring import CodeSpace, Variant, code_space
+from mastermind.core.strategies import STRATEGIES
+
+'''
+Exact turn analytics: the distribution of the number of turns a strategy still needs to solve the game,
+over every secret consistent with the game so far (all equally likely).
+
+The game tree of the strategy is walked from the current candidate set; evaluated subtrees are kept in
+a transposition table keyed by a fingerprint of their candidate set, so that a subtree reached again,
+from another branch or another game, is never evaluated twice. Strategies must be deterministic
+functions of the candidate set, like the exhaustive ones of `STRATEGIES`.
+'''
+
+# Above this many candidates the whole game tree is too large to be walked interactively.
+MAX_ANALYTICS_CANDIDATES = 1296
+
+
+class TurnAnalytics:
+
+    def __init__(
+        self,
+        space: CodeSpace,
+        strategy: Union[str, Callable] = 'minimax',
+        max_entries: int = 1 << 16
+        ) -> None:
+        """Initialize class.
+
+        Args:
+            space (CodeSpace): code space of the game
+            strategy (Union[str, Callable], optional): agent guess strategy, a name in `STRATEGIES` or a callable. Defaults to 'minimax'.
+            max_entries (int, optional): size bound of the transposition table, least recently used subtrees are dropped beyond it. Defaults to 1 << 16.
+        """
+        self.space = space
+        self.strategy = STRATEGIES[strategy] if isinstance(strategy, str) else strategy
+        self.max_entries = max_entries
+        self.table = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # sessions of the same board share the table, see `turn_analytics`
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+        self._win = space.encode_hint(space.N_SLOTS, 0)
+
+    @staticmethod
+    def fingerprint(candidates: np.ndarray) -> bytes:
+        """Canonical fingerprint of a candidate set: digest of its sorted indices."""
+        return hashlib.blake2b(np.asarray(candidates, dtype=np.int64).tobytes(), digest_size=16).digest()
+
+    def distribution(self, candidates: Sequence[int], history: Optional[Sequence[int]] = None) -> np.ndarray:
+        """Number of secrets solved in exactly k more turns, for each k.
+
+        Args:
+            candidates (Sequence[int]): sorted indices of the codes still consistent with the game
+            history (Optional[Sequence[int]], optional): indices of the guesses scored so far, only used to speed up strategies. Defaults to None.
+
+        Returns:
+            np.ndarray: turn counts, indexed by number of turns
+        """
+        candidates = np.asarray(candidates, dtype=np.int64)
+        if len(candidates) == 0:
+            return np.zeros(1, dtype=np.int64)
+        if len(candidates) == 1:
+            return np.array([0, 1], dtype=np.int64)
+        key = self.fingerprint(candidates)
+        with self._lock:
+            cached = self.table.get(key)
+            if cached is not None:
+                self.hits += 1
+                self.table.move_to_end(key)
+                return cached
+            self.misses += 1
+
+        history = list(history) if history is not None else None
+        guess = self.strategy(self.space, candidates, self._rng, history)
+        hints = self.space.hints(guess, candidates)
+        parts = [self._win] if (hints == self._win).any() else []
+        counts = [np.array([0, 1], dtype=np.int64)] if parts else []
+        for hint in np.unique(hints):
+            if hint == self._win:
+                continue
+            part = candidates[hints == hint]
+            if len(part) == len(candidates):
+                raise ValueError(f'Guess {guess} does not split the candidate set, the game tree is infinite')
+            counts.append(np.concatenate([[0], self.distribution(part, history + [guess] if history is not None else None)]))
+        result = np.zeros(max(len(c) for c in counts), dtype=np.int64)
+        for c in counts:
+            result[:len(c)] += c
+        result.flags.writeable = False
+
+        # subtrees are evaluated outside the lock, concurrent evaluations of the same one agree
+        with self._lock:
+            self.table[key] = result
+            if len(self.table) > self.max_entries:
+                self.table.popitem(last=False)
+        return result
+
+    def expected_turns(self, candidates: Sequence[int], history: Optional[Sequence[int]] = None) -> float:
+        """Expected number of turns left to solve the game.
+
+        Args:
+            candidates (Sequence[int]): sorted indices of the codes still consistent with the game
+            history (Optional[Sequence[int]], optional): indices of the guesses scored so far. Defaults to None.
+
+        Returns:
+            float: expected number of turns
+        """
+        distribution = self.distribution(candidates, history)
+        total = distribution.sum()
+        return float(np.arange(len(distribution)) @ distribution/total) if total else 0.0
+
+
+@lru_cache(maxsize=None)
+def turn_analytics(N_SLOTS: int, N_COLORS: int, strategy: str = 'minimax', variant: Union[str, Variant] = 'classic') -> TurnAnalytics:
+    """Analytics of a board, variant and strategy, whose transposition table is shared by every game of the process."""
+    return TurnAnalytics(code_space(N_SLOTS, N_COLORS, variant), strategy)
@@ -0,0 +1,190 @@
+import random
+import argparse
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Optional, Union
+
+import numpy as np
+
+from mastermind.core.cache import cache_dir
+from mastermind.core.scoring import VARIANTS, code_space
+from mastermind.core.strategies import STRATEGIES
+
+'''
+Opening book: the agent decision tree of a strategy, computed offline.
+
+Node 0 is the first guess; `children[node, hint]` is the node to move to once `hint` is
+received for the guess of `node`, -1 where the tree has not been expanded.
+'''
+
+BOOK_VERSION = 1
+
+
+class OpeningBook:
+
+    def __init__(
+        self,
+        N_SLOTS: int,
+        N_COLORS: int,
+        strategy: str,
+        guesses: np.ndarray,
+        children: np.ndarray,
+        variant: str = 'classic'
+        ) -> None:
+        """Initialize class.
+
+        Args:
+            N_SLOTS (int): length of code
+            N_COLORS (int): number of distinct available colors
+            strategy (str): name of the strategy the book was built with
+            guesses (np.ndarray): code index guessed at each node
+            children (np.ndarray): (n_nodes, n_hints) transition table
+            variant (str, optional): game variant the book was built for, a name in `VARIANTS`. Defaults to 'classic'.
+        """
+        self.N_SLOTS = N_SLOTS
+        self.N_COLORS = N_COLORS
+        self.strategy = strategy
+        self.variant = variant
+        self.guesses = guesses
+        self.children = children
+
+    def __len__(self) -> int:
+        return len(self.guesses)
+
+    def next_node(self, node: Optional[int], guess: int, hint: int) -> Optional[int]:
+        """Follow the tree after a scored guess.
+
+        Args:
+            node (Optional[int]): current node, None if already off book
+            guess (int): index of the code which has been scored
+            hint (int): encoded hint received
+
+        Returns:
+            Optional[int]: next node, None if the game left the book
+        """
+        if node is None or self.guesses[node] != guess:
+            return None
+        child = int(self.children[node, hint])
+        return child if child >= 0 else None
+
+    @classmethod
+    def build(
+        cls,
+        N_SLOTS: int,
+        N_COLORS: int,
+        strategy: Union[str, Callable] = 'minimax',
+        rng: Union[int, random.Random, None] = 0,
+        max_depth: Optional[int] = None,
+        variant: str = 'classic'
+        ) -> 'OpeningBook':
+        """Walk the whole game tree of a strategy, breadth first.
+
+        Args:
+            N_SLOTS (int): length of code
+            N_COLORS (int): number of distinct available colors
+            strategy (Union[str, Callable], optional): agent guess strategy, a name in `STRATEGIES` or a callable. Defaults to 'minimax'.
+            rng (Union[int, random.Random, None], optional): random generator, or seed of a new one. Defaults to 0.
+            max_depth (Optional[int], optional): number of turns covered by the book, unbounded by default. Defaults to None.
+            variant (str, optional): game variant, a name in `VARIANTS`. Defaults to 'classic'.
+
+        Returns:
+            OpeningBook: decision tree of the strategy
+        """
+        space = code_space(N_SLOTS, N_COLORS, variant)
+        name = strategy if isinstance(strategy, str) else getattr(strategy, '__name__', 'custom')
+        strategy = STRATEGIES[strategy] if isinstance(strategy, str) else strategy
+        rng = rng if isinstance(rng, random.Random) else random.Random(rng)
+        win = space.encode_hint(N_SLOTS, 0)
+
+        guesses, children = [], []
+        queue = deque([(np.arange(space.n_codes), ())])
+        while queue:
+            candidates, history = queue.popleft()
+            node = len(guesses)
+            guess = strategy(space, candidates, rng, list(history))
+            guesses.append(guess)
+            children.append(np.full(space.n_hints, -1, dtype=np.int32))
+            if max_depth is not None and len(history) + 1 >= max_depth:
+                continue
+            hints = space.hints(guess, candidates)
+            for hint in np.unique(hints):
+                if hint != win:
+                    children[node][hint] = node + len(queue) + 1
+                    queue.append((candidates[hints == hint], history + (guess,)))
+        return cls(N_SLOTS, N_COLORS, name, np.array(guesses, dtype=np.int64), np.stack(children), variant)
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Serialize the book as a compressed `.npz` archive."""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'wb') as f:
+            np.savez_compressed(
+                f,
+                meta=np.array([BOOK_VERSION, self.N_SLOTS, self.N_COLORS]),
+                strategy=np.array(self.strategy),
+                variant=np.array(self.variant),
+                guesses=self.guesses,
+                children=self.children,
+                )
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'OpeningBook':
+        """Deserialize a book written by `save`."""
+        with np.load(path) as data:
+            version, N_SLOTS, N_COLORS = (int(x) for x in data['meta'])
+            if version != BOOK_VERSION:
+                raise ValueError(f'Unsupported opening book version {version}')
+            # books saved before variants existed are classic ones
+            variant = str(data['variant']) if 'variant' in data.files else 'classic'
+            return cls(N_SLOTS, N_COLORS, str(data['strategy']), data['guesses'], data['children'], variant)
+
+    @staticmethod
+    def default_path(N_SLOTS: int, N_COLORS: int, strategy: str, variant: str = 'classic') -> Optional[Path]:
+        """Where books are stored by default, next to the cached tables."""
+        directory = cache_dir()
+        if directory is None:
+            return None
+        return directory/'books'/f'{code_space(N_SLOTS, N_COLORS, variant).key}-{strategy}.npz'
+
+    @classmethod
+    def find(cls, N_SLOTS: int, N_COLORS: int, strategy: str, variant: str = 'classic') -> Optional['OpeningBook']:
+        """Load the book of a configuration from its default path, None if it has not been built."""
+        path = cls.default_path(N_SLOTS, N_COLORS, strategy, variant)
+        if path is None or not path.exists():
+            return None
+        return cls.load(path)
+
+
+@lru_cache(maxsize=None)
+def opening_book(N_SLOTS: int, N_COLORS: int, strategy: str, variant: str = 'classic') -> Optional[OpeningBook]:
+    """Book of a configuration built offline, loaded once per process and shared by every game; None if missing or unreadable."""
+    try:
+        return OpeningBook.find(N_SLOTS, N_COLORS, strategy, variant)
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Build MasterMind opening books offline.')
+    parser.add_argument('--slots', type=int, nargs='+', default=[4], help='code lengths')
+    parser.add_argument('--colors', type=int, nargs='+', default=[6], help='numbers of distinct colors')
+    parser.add_argument('--strategy', default='minimax', choices=sorted(STRATEGIES), help='agent guess strategy')
+    parser.add_argument('--max-depth', type=int, default=None, help='number of turns covered by the book')
+    parser.add_argument('--variant', default='classic', choices=list(VARIANTS), help='game variant')
+    parser.add_argument('--output', default=None, help='output file, defaults to the cache directory (single board only)')
+    args = parser.parse_args()
+    if args.output and len(args.slots)*len(args.colors) > 1:
+        parser.error('--output requires a single board')
+    for N_SLOTS in args.slots:
+        for N_COLORS in args.colors:
+            book = OpeningBook.build(N_SLOTS, N_COLORS, args.strategy, max_depth=args.max_depth, variant=args.variant)
+            path = args.output or OpeningBook.default_path(N_SLOTS, N_COLORS, args.strategy, args.variant)
+            if path is None:
+                parser.error('the cache is disabled, pass --output')
+            book.save(path)
+            print(f'{N_SLOTS}x{N_COLORS} {args.variant}: {len(book)} nodes -> {path}')
+
+
+if __name__ == '__main__':
+    main()
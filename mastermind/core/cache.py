@@ -0,0 +1,158 @@
+import os
+import re
+import json
+import zlib
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+'''
+Persistent cache of per-configuration tables, stored as `.npy` files and memory-mapped on load,
+so that every process of the machine shares one page-cache copy of each table.
+
+Environment variables:
+    MASTERMIND_CACHE_DIR: cache directory, defaults to ~/.cache/mastermind (empty to disable the cache)
+    MASTERMIND_CACHE_MAX_BYTES: size bound of the cache directory, defaults to 1 GiB
+'''
+
+# Bump whenever the layout or the semantics of a cached table change.
+CACHE_VERSION = 1
+DEFAULT_MAX_BYTES = 1 << 30
+# File names of the cached tables, f'{name}-v{version}-{key}.npy': nothing else in the directory is ever removed.
+_TABLE_NAME = re.compile(r'[a-z_]+-v\d+-\d+x\d+(-[a-z]+)*\.npy')
+
+_verified = set()
+
+
+def cache_dir() -> Optional[Path]:
+    """Directory of the cache, None if caching is disabled."""
+    path = os.environ.get('MASTERMIND_CACHE_DIR', str(Path.home()/'.cache'/'mastermind'))
+    return Path(path) if path else None
+
+
+def max_bytes() -> int:
+    """Size bound of the cache directory."""
+    return int(os.environ.get('MASTERMIND_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+
+
+def _checksum(path: Path, block: int = 1 << 24) -> int:
+    """CRC32 of a file, streamed in blocks."""
+    crc = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(block), b''):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def _load(path: Path, meta_path: Path) -> Optional[np.ndarray]:
+    """Memory-map a cached table, None if it is missing, stale or corrupted."""
+    try:
+        meta = json.loads(meta_path.read_text())
+        if meta.get('version') != CACHE_VERSION or meta.get('size') != path.stat().st_size:
+            return None
+        if path not in _verified:
+            if meta.get('crc32') != _checksum(path):
+                return None
+            _verified.add(path)
+        array = np.load(path, mmap_mode='r')
+    except (OSError, ValueError):
+        return None
+    if list(array.shape) != meta.get('shape') or str(array.dtype) != meta.get('dtype'):
+        return None
+    # mtime tracks last use, for eviction; read-only caches are used as they are
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return array
+
+
+def _store(path: Path, meta_path: Path, array: np.ndarray) -> None:
+    """Atomically write a table and its metadata."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # unique per thread, as sessions and server workers may build the same table at once
+    suffix = f'{os.getpid()}.{threading.get_ident()}.tmp'
+    tmp = path.with_name(f'{path.name}.{suffix}')
+    with open(tmp, 'wb') as f:
+        np.save(f, array)
+    meta = dict(
+        version=CACHE_VERSION,
+        shape=list(array.shape),
+        dtype=str(array.dtype),
+        size=tmp.stat().st_size,
+        crc32=_checksum(tmp),
+        )
+    meta_tmp = meta_path.with_name(f'{meta_path.name}.{suffix}')
+    meta_tmp.write_text(json.dumps(meta))
+    os.replace(tmp, path)
+    os.replace(meta_tmp, meta_path)
+    _verified.add(path)
+
+
+def evict(directory: Path, limit: int, keep: Optional[Path] = None) -> None:
+    """Remove tables of older cache versions, then least recently used ones until the directory fits the limit.
+
+    Args:
+        directory (Path): cache directory
+        limit (int): size bound, in bytes
+        keep (Optional[Path], optional): table which must not be evicted. Defaults to None.
+    """
+    tables = []
+    for path in directory.glob('*-v*-*.npy'):
+        if not _TABLE_NAME.fullmatch(path.name):
+            continue
+        meta_path = path.with_suffix('.json')
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        try:
+            version = json.loads(meta_path.read_text()).get('version')
+        except (OSError, ValueError):
+            version = None
+        if version != CACHE_VERSION and path != keep:
+            path.unlink(missing_ok=True)
+            meta_path.unlink(missing_ok=True)
+        else:
+            tables.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in tables)
+    for _, size, path in sorted(tables):
+        if total <= limit:
+            break
+        if path == keep:
+            continue
+        path.unlink(missing_ok=True)
+        path.with_suffix('.json').unlink(missing_ok=True)
+        total -= size
+
+
+def cached(name: str, key: str, build: Callable[[], np.ndarray]) -> np.ndarray:
+    """Return a table from the persistent cache, building and storing it on a miss.
+
+    Args:
+        name (str): kind of table, e.g. 'score_table'
+        key (str): configuration the table belongs to, e.g. '4x6'
+        build (Callable[[], np.ndarray]): computes the table on a cache miss
+
+    Returns:
+        np.ndarray: the table, memory-mapped read-only when it comes from the cache
+    """
+    directory = cache_dir()
+    if directory is None:
+        return build()
+    path = directory/f'{name}-v{CACHE_VERSION}-{key}.npy'
+    meta_path = path.with_suffix('.json')
+    array = _load(path, meta_path)
+    if array is not None:
+        return array
+    array = build()
+    try:
+        _store(path, meta_path, array)
+        evict(directory, max_bytes(), keep=path)
+        stored = _load(path, meta_path)
+    except OSError:
+        # read-only or full disk: keep working from memory
+        return array
+    return array if stored is None else stored
@@ -0,0 +1,176 @@
+import os
+import json
+import atexit
+import time
+import logging
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from pathlib import Path
+from typing import IO, Callable, Iterator, NamedTuple, Optional, Sequence, Union
+
+'''
+Instrumentation of the game engine.
+
+Hooks are callables receiving one `Event` per instrumented operation (guesses, pruning, guess selection,
+win odds, rendering), e.g. `MasterMind(hooks=[JSONLinesSink('metrics.jsonl')])`. A game without hooks only
+pays for one attribute check per call. Allocation deltas are reported while `tracemalloc` is tracing
+(e.g. under `python -X tracemalloc`), None otherwise.
+
+Environment variables:
+    MASTERMIND_METRICS: file the dashboard writes metrics to, in Prometheus text format if it ends
+        with `.prom`, as JSON lines otherwise (unset to disable instrumentation)
+'''
+
+
+class Event(NamedTuple):
+    """Measurements of one instrumented operation."""
+
+    operation: str
+    board: str
+    turn: int
+    seconds: float
+    candidates_before: Optional[int]
+    candidates_after: Optional[int]
+    alloc_bytes: Optional[int]
+    timestamp: float
+
+
+Hook = Callable[[Event], None]
+
+logger = logging.getLogger(__name__)
+
+
+def emit(hooks: Sequence[Hook], event: Event) -> None:
+    """Report an event to every hook: a failing hook is logged, never raised into the game."""
+    for hook in hooks:
+        try:
+            hook(event)
+        except Exception:
+            logger.exception('instrumentation hook %r failed on %s', hook, event.operation)
+
+
+@contextmanager
+def span(hooks: Sequence[Hook], operation: str, board: str = '', turn: int = 0) -> Iterator[None]:
+    """Time a block outside of the engine (e.g. a session sync) and report it to the hooks."""
+    if not hooks:
+        yield
+        return
+    tracing = tracemalloc.is_tracing()
+    allocated = tracemalloc.get_traced_memory()[0] if tracing else None
+    start = time.perf_counter()
+    yield
+    seconds = time.perf_counter() - start
+    alloc = tracemalloc.get_traced_memory()[0] - allocated if tracing else None
+    emit(hooks, Event(operation, board, turn, seconds, None, None, alloc, time.time()))
+
+
+def instrumented(operation: str) -> Callable:
+    """Decorate a `MasterMind` method to report an `Event` to the hooks of the game, if any."""
+    def decorator(method: Callable) -> Callable:
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not self.hooks:
+                return method(self, *args, **kwargs)
+            before = self.n_candidates
+            tracing = tracemalloc.is_tracing()
+            allocated = tracemalloc.get_traced_memory()[0] if tracing else None
+            start = time.perf_counter()
+            result = method(self, *args, **kwargs)
+            seconds = time.perf_counter() - start
+            alloc = tracemalloc.get_traced_memory()[0] - allocated if tracing else None
+            emit(self.hooks, Event(
+                operation, self.space.key, self.trials, seconds, before, self.n_candidates, alloc, time.time()
+                ))
+            return result
+        return wrapper
+    return decorator
+
+
+class JSONLinesSink:
+
+    def __init__(self, target: Union[str, Path, IO[str]]) -> None:
+        """Initialize class.
+
+        Args:
+            target (Union[str, Path, IO[str]]): file (appended to) or stream the events are written to, one JSON object per line
+        """
+        self.stream = open(target, 'a', buffering=1) if isinstance(target, (str, Path)) else target
+        self._lock = threading.Lock()
+
+    def __call__(self, event: Event) -> None:
+        line = json.dumps(event._asdict())
+        with self._lock:
+            self.stream.write(line + '\n')
+
+
+class PrometheusSink:
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, interval: float = 5.0) -> None:
+        """Initialize class.
+
+        Args:
+            path (Optional[Union[str, Path]], optional): file rewritten with the metrics (e.g. for the node exporter textfile collector), None to only `render` them. Defaults to None.
+            interval (float, optional): minimum number of seconds between two writes of the file. Defaults to 5.0.
+        """
+        self.path = Path(path) if path is not None else None
+        self.interval = interval
+        # (operation, board) -> [count, seconds, candidates removed, allocated bytes]
+        self.totals = {}
+        self._written = 0.0
+        self._lock = threading.Lock()
+        if self.path is not None:
+            atexit.register(self.write)
+
+    def __call__(self, event: Event) -> None:
+        with self._lock:
+            totals = self.totals.setdefault((event.operation, event.board), [0, 0.0, 0, 0])
+            totals[0] += 1
+            totals[1] += event.seconds
+            if event.candidates_before is not None:
+                totals[2] += event.candidates_before - event.candidates_after
+            if event.alloc_bytes is not None:
+                totals[3] += event.alloc_bytes
+            due = self.path is not None and time.monotonic() - self._written >= self.interval
+            if due:
+                # claimed under the lock, so that concurrent events do not write the file twice
+                self._written = time.monotonic()
+        if due:
+            self.write()
+
+    def render(self) -> str:
+        """Metrics in the Prometheus text exposition format."""
+        metrics = [
+            ('mastermind_operation_total', 'counter', 'Instrumented operations.', 0),
+            ('mastermind_operation_seconds_total', 'counter', 'Time spent in instrumented operations.', 1),
+            ('mastermind_candidates_removed_total', 'counter', 'Candidate codes ruled out by instrumented operations.', 2),
+            ('mastermind_allocated_bytes', 'gauge', 'Net memory allocated by instrumented operations, while tracemalloc is tracing.', 3),
+            ]
+        with self._lock:
+            totals = sorted(self.totals.items())
+        lines = []
+        for name, kind, description, column in metrics:
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {kind}')
+            for (operation, board), values in totals:
+                lines.append(f'{name}{{operation="{operation}",board="{board}"}} {values[column]}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self) -> None:
+        """Atomically rewrite the metrics file."""
+        if self.path is None:
+            return
+        with self._lock:
+            self._written = time.monotonic()
+        tmp = self.path.with_name(f'{self.path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        tmp.write_text(self.render())
+        os.replace(tmp, self.path)
+
+
+def sinks_from_env() -> list:
+    """Hooks configured through MASTERMIND_METRICS, none if it is unset."""
+    path = os.environ.get('MASTERMIND_METRICS')
+    if not path:
+        return []
+    return [PrometheusSink(path) if path.endswith('.prom') else JSONLinesSink(path)]
@@ -1,51 +1,305 @@
+import sys
+import struct
 import random
 import itertools
+from functools import lru_cache
 from textwrap import dedent
-from collections import Counter
-from typing import Optional
+from types import MappingProxyType
+from typing import Callable, Iterable, Mapping, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+from mastermind.core.analytics import turn_analytics
+from mastermind.core.book import OpeningBook
+from mastermind.core.instrumentation import Hook, instrumented
+from mastermind.core.scoring import code_space
+from mastermind.core.strategies import STRATEGIES
+
+# hint byte of a turn whose guess has not been scored yet
+PENDING_HINT = 255
+# Above this many candidates the hints of a pending guess are only counted, chunk by chunk, and not kept for pruning.
+MAX_PARTITION_CODES = 1 << 24
+
+# Snapshot layout (little endian): header, turns as (code index, hint byte) records, then the
+# candidate bitset (bit k of byte k // 8 set iff code k is still a candidate), packed LSB first.
+SNAPSHOT_MAGIC = b'MMG'
+SNAPSHOT_VERSION = 1
+# magic, version, N_SLOTS, N_COLORS, flags, bytes per code index, turns, trials, secret, user code (-1 if none), book node (-1 if none)
+_SNAPSHOT_HEADER = struct.Struct('<3sBBBBBII3q')
+_SNAPSHOT_SUCCESS = 1
+_SNAPSHOT_EXPLAINED = 2
+# variant of the game, as its position in this append-only tuple, in bits 2-3 of the flags (0 for classic games)
+_SNAPSHOT_VARIANTS = ('classic', 'no_repeat', 'black_only', 'bulls_cows')
+_SNAPSHOT_VARIANT_SHIFT = 2
+_SNAPSHOT_VARIANT_MASK = 3 << _SNAPSHOT_VARIANT_SHIFT
+
+
+class BoardTables(NamedTuple):
+    """Immutable display tables of a board configuration, shared by every game of the process."""
+    colors: tuple
+    colors_dict: Mapping[int, str]
+    inv_dict: Mapping[str, int]
+    possible_hints: tuple
+
+
+@lru_cache(maxsize=None)
+def board_tables(N_SLOTS: int, N_COLORS: int, whites: bool = True) -> BoardTables:
+    """Display tables of a board configuration, built once per process.
+
+    Args:
+        N_SLOTS (int): length of code
+        N_COLORS (int): number of distinct available colors
+        whites (bool, optional): whether hints count white pegs. Defaults to True.
+
+    Returns:
+        BoardTables: colors, color maps and possible hints
+    """
+    palette = ("📕", "📘", "📗", "📒", "📓", "📔")
+    # palette = ("🔴", "🔵", "🟢", "🟡", "🟣", "🟤")
+    # boards with more colors than emoji fall back to plain digits
+    colors = palette[:N_COLORS] + tuple(str(k) for k in range(len(palette), N_COLORS))
+    colors_dict = dict(enumerate(colors))
+    inv_dict = dict((v,k) for k,v in colors_dict.items())
+    possible_hints = []
+    for _ in range(N_SLOTS + 1):
+        possible_hints.extend(list(itertools.combinations_with_replacement(MasterMind.hints if whites else MasterMind.hints[:1], _)))
+    return BoardTables(colors, MappingProxyType(colors_dict), MappingProxyType(inv_dict), tuple(possible_hints))
+
+
+class HintPartition(NamedTuple):
+    """Candidates of a game split by the hint its pending guess would receive, see `MasterMind.hint_partition`."""
+    guess: int
+    # candidates left by each encoded hint, the winning one counting the guess itself
+    counts: np.ndarray
+    # hint of every code the partition was computed on (the survivors, or the whole space), None if too many
+    hints: Optional[np.ndarray]
+    # survivor array the hints are aligned with, None for the whole space
+    candidates: Optional[np.ndarray]
+
+
+class Turn:
+
+    __slots__ = ('code', 'hint')
+
+    def __init__(self, code: int, hint: int = PENDING_HINT) -> None:
+        """Initialize class.
+
+        Args:
+            code (int): index of the guessed code
+            hint (int, optional): encoded hint received (see `CodeSpace.encode_hint`). Defaults to PENDING_HINT.
+        """
+        self.code = code
+        self.hint = hint
+
+    def __repr__(self) -> str:
+        return f'Turn(code={self.code}, hint={self.hint})'
 
 class MasterMind:
 
-    def __init__(self, N_SLOTS: int = 4, N_COLORS: int = 6) -> None:
+    secret = '❔'
+    hints = ("◼️", "◻️")
+
+    def __init__(
+        self,
+        N_SLOTS: int = 4,
+        N_COLORS: int = 6,
+        strategy: Union[str, Callable] = 'random',
+        rng: Union[int, random.Random, None] = None,
+        book: Optional[OpeningBook] = None,
+        hooks: Optional[Iterable[Hook]] = None,
+        variant: str = 'classic'
+        ) -> None:
         """Initialize class.
 
         Args:
             N_SLOTS (int, optional): length of code. Defaults to 4.
             N_COLORS (int, optional): number of distinct available colors. Defaults to 6.
+            strategy (Union[str, Callable], optional): agent guess strategy, a name in `STRATEGIES` or a callable. Defaults to 'random'.
+            rng (Union[int, random.Random, None], optional): random generator, or seed of a new one, driving secret and agent guesses. Defaults to None.
+            book (Optional[OpeningBook], optional): precomputed agent decision tree, followed as long as the game stays on it. Defaults to None.
+            hooks (Optional[Iterable[Hook]], optional): callbacks receiving an `instrumentation.Event` per guess, pruning, guess selection, win odds and rendering. Defaults to None.
+            variant (str, optional): game variant, a name in `VARIANTS`: 'classic', 'no_repeat' (codes never repeat a color), 'bulls_cows' (same rules) or 'black_only' (hints only count black pegs). Defaults to 'classic'.
         """
 
         self.N_COLORS = N_COLORS
         self.N_SLOTS = N_SLOTS
+        self.variant = variant
+        self.hooks = list(hooks) if hooks is not None else []
+        self.space = code_space(N_SLOTS, N_COLORS, variant)
+        self.strategy = STRATEGIES[strategy] if isinstance(strategy, str) else strategy
+        self.rng = rng if isinstance(rng, random.Random) else random.Random(rng)
+        if book is not None and code_space(book.N_SLOTS, book.N_COLORS, book.variant) is not self.space:
+            raise ValueError(
+                f'Opening book is for {book.variant} {book.N_SLOTS}x{book.N_COLORS} games, not {variant} {N_SLOTS}x{N_COLORS}'
+                )
+        self.book = book
+        self.book_node = 0 if book is not None else None
 
-        self.omega = list(itertools.product(range(self.N_COLORS), repeat=self.N_SLOTS))
-        self.complement = set(self.omega).difference
-        self.memory = set()
+        self.omega = self.space
+        # sorted indices of the codes consistent with the hints so far, None while no hint has been received
+        self.survivors = None
+        self.n_candidates = self.space.n_codes
+        # guessed codes not yet dropped from the survivors
+        self._played = set()
+        self._explained = True
         self.turns = []
+        self._partition = None
+        # (guess, hint, survivors) found by `is_coherent` on spaces too large for a partition
+        self._scanned = None
 
-        self.secret_code = random.choice(self.omega)
+        self.secret_code = self.space.decode(self.space.random_index(self.rng))
         self.user_code = None
         self.trials = 0
-        self.history = []
         self.success = False
 
-        colors = ("📕", "📘", "📗", "📒", "📓", "📔")
-        # colors = ("🔴", "🔵", "🟢", "🟡", "🟣", "🟤")
-        self.colors = colors[:N_COLORS]
-        self.secret = '❔'
-        self.hints = ("◼️", "◻️")
-        self.colors_dict = dict(enumerate(self.colors))
-        self.inv_dict = dict((v,k) for k,v in self.colors_dict.items())
-        self.possible_hints = []
-        for _ in range(self.N_SLOTS + 1):
-            self.possible_hints.extend(list(itertools.combinations_with_replacement(self.hints, _)))
+        # shared by every game of the same board, see `board_tables`
+        self.colors, self.colors_dict, self.inv_dict, self.possible_hints = board_tables(N_SLOTS, N_COLORS, self.space.whites)
 
+    @instrumented('make_code')
     def make_code(self) -> tuple:
         """Generates a code.
 
         Returns:
             tuple: mastermind code
         """
-        return random.choice(list(self.complement(self.memory)))
+        if not self.n_candidates:
+            raise IndexError('No code is consistent with the hints received so far')
+        if self.book_node is not None:
+            return self.omega[int(self.book.guesses[self.book_node])]
+        history = [turn.code for turn in self.turns] if self._explained else None
+        return self.omega[self.strategy(self.space, self.candidate_indices(), self.rng, history)]
+
+    def candidate_indices(self) -> Sequence[int]:
+        """Indices of the codes still consistent with the game.
+
+        The survivor array is shared between calls, so drawing from it is O(1); while no code
+        has been ruled out a `range` over the whole space is returned instead, without allocating anything.
+
+        Returns:
+            Sequence[int]: sorted candidate indices, not to be modified
+        """
+        if self.survivors is None and not self._played:
+            return range(self.space.n_codes)
+        self._drop_played()
+        return self.survivors
+
+    def _is_survivor(self, idx: int) -> bool:
+        if idx in self._played:
+            return False
+        if self.survivors is None:
+            return True
+        pos = np.searchsorted(self.survivors, idx)
+        return pos < len(self.survivors) and self.survivors[pos] == idx
+
+    def _drop_played(self) -> None:
+        """Remove played codes from the survivors, materializing them if needed."""
+        if not self._played:
+            return
+        played = np.fromiter(self._played, dtype=np.int64)
+        if self.survivors is None:
+            self.survivors = np.setdiff1d(np.arange(self.space.n_codes), played, assume_unique=True)
+        else:
+            self.survivors = self.survivors[~np.isin(self.survivors, played)]
+        self._played = set()
+
+    @property
+    def memory(self) -> set:
+        """Codes ruled out so far, derived from the survivors.
+
+        Returns:
+            set: eliminated codes
+        """
+        return {self.omega[k] for k in np.setdiff1d(np.arange(self.space.n_codes), self.candidate_indices())}
+
+    @memory.setter
+    def memory(self, codes: Iterable[tuple]) -> None:
+        codes = list(codes)
+        self.survivors = None
+        self._played = set()
+        self._partition = self._scanned = None
+        if codes:
+            self.survivors = np.setdiff1d(np.arange(self.space.n_codes), self.space.index_many(codes))
+        self.n_candidates = self.space.n_codes if self.survivors is None else len(self.survivors)
+        self.book_node = None
+        # candidates no longer follow from the scored turns alone
+        self._explained = False
+
+    def complement(self, memory: Optional[Iterable[tuple]] = None) -> set:
+        """Codes still consistent with the game so far.
+
+        Args:
+            memory (Optional[Iterable[tuple]], optional): eliminated codes. Defaults to the game memory.
+
+        Returns:
+            set: remaining codes
+        """
+        if memory is None:
+            return {self.omega[k] for k in self.candidate_indices()}
+        return set(self.omega).difference(memory)
+
+    @instrumented('apply_feedback')
+    def apply_feedback(self, guess: tuple, hint: tuple) -> None:
+        """Narrow the survivors to the codes which would have produced the given hint.
+
+        Only surviving codes are scored and the survivor array is compacted in place,
+        so each turn costs less than the previous one; the very first feedback walks
+        the whole space in chunks. Hints of the guess already scored by `hint_partition`,
+        or codes already found by `is_coherent`, are reused instead.
+
+        Args:
+            guess (tuple): code which has been scored
+            hint (tuple): number of right colors in right locations and right colors in wrong locations
+        """
+        guess = self.space.index(guess)
+        hint = self.space.encode_hint(*hint)
+        # hints already scored by `hint_partition` drive the pruning, if they are still aligned with the survivors
+        partition = self._current_partition(guess)
+        scanned, self._partition, self._scanned = self._scanned, None, None
+        if partition is not None and partition.hints is None:
+            partition = None
+        played = np.fromiter(self._played, dtype=np.int64)
+        self._played = set()
+        if self.survivors is None:
+            if scanned is not None and scanned[:2] == (guess, hint):
+                self.survivors = scanned[2]
+            elif partition is not None:
+                self.survivors = np.flatnonzero(partition.hints == hint)
+                if len(played):
+                    self.survivors = self.survivors[~np.isin(self.survivors, played)]
+            else:
+                self.survivors = self._scan(guess, hint, played)
+        else:
+            keep = (partition.hints if partition is not None else self.space.hints(guess, self.survivors)) == hint
+            if len(played):
+                keep &= ~np.isin(self.survivors, played)
+            n = int(np.count_nonzero(keep))
+            np.compress(keep, self.survivors, out=self.survivors[:n])
+            # let go of the larger buffer once most of it is dead
+            self.survivors = self.survivors[:n].copy() if 4*n < len(self.survivors) else self.survivors[:n]
+        self.n_candidates = len(self.survivors)
+        if self.turns and self.turns[-1].code == guess:
+            self.turns[-1].hint = hint
+        if self.book_node is not None:
+            self.book_node = self.book.next_node(self.book_node, guess, hint)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the game itself, leaving out the code space tables shared by every game.
+
+        Returns:
+            int: size in bytes
+        """
+        size = sys.getsizeof(self.__dict__)
+        if self.survivors is not None:
+            size += self.survivors.nbytes
+        hints = self._partition.hints if self._partition is not None else None
+        # hints of the whole space are a row of the shared score table, when there is one
+        if hints is not None and not (self.space.table is not None and np.may_share_memory(hints, self.space.table)):
+            size += hints.nbytes
+        if self._scanned is not None:
+            size += self._scanned[2].nbytes
+        size += sys.getsizeof(Turn(0))*len(self.turns) + sys.getsizeof(self.turns)
+        return size + sys.getsizeof(self._played)
 
     def paint(self, number_code: tuple) -> str:
         """Visualize a code through colors
@@ -67,7 +321,7 @@ class MasterMind:
     def get_hint(self, guess: tuple, versus: Optional[str] = None) -> tuple:
         """Check the submitted code versus another code (secret one by default).
 
-        credits to https://stackoverflow.com/questions/45792466/mastermind-python-coding
+        Looks up the precomputed score table of the code space, scored by the rules of the variant.
 
         Args:
             guess (tuple): code to be checked
@@ -78,9 +332,25 @@ class MasterMind:
         """
         if versus is None:
             versus = self.secret_code
-        right_colors = sum((Counter(guess) & Counter(versus)).values())
-        right_locations = sum(i==j for i,j in zip(guess, versus))
-        return right_locations, right_colors - right_locations
+        if not self.space.repeats and len(set(guess)) < self.N_SLOTS:
+            raise ValueError(f'Codes of the {self.variant} variant cannot repeat a color, got {guess}')
+        hint = self.space.hints(self.space.index(guess), [self.space.index(versus)])[0]
+        return self.space.decode_hint(hint)
+
+    def get_hints(self, guess: tuple, candidates: Iterable[tuple]) -> np.ndarray:
+        """Check the submitted code versus many codes at once.
+
+        Args:
+            guess (tuple): code to be checked
+            candidates (Iterable[tuple]): the codes to check against
+
+        Returns:
+            np.ndarray: encoded hints (see `CodeSpace.encode_hint`), one per candidate
+        """
+        candidates = list(candidates)
+        if not candidates:
+            return np.empty(0, dtype=np.uint8)
+        return self.space.hints(self.space.index(guess), self.space.index_many(candidates))
 
     def translate_hint(self, painted_hint: str) -> tuple:
         """Turns a colored hint into a numerical one
@@ -93,47 +363,184 @@ class MasterMind:
         """
         return painted_hint.count(self.hints[0]), painted_hint.count(self.hints[1])
 
-    def memorize(self, code: tuple) -> None:
+    def memorize(self, code: tuple, hint: Optional[tuple] = None) -> None:
         """Add to game memory the given code
 
         Args:
             code (tuple): code to be recorded
+            hint (Optional[tuple], optional): hint received for the code, if already known. Defaults to None.
         """
         self.trials += 1
-        self.memory.add(code)
-        self.turns.append(code)
+        self._partition = self._scanned = None
+        idx = self.space.index(code)
+        if self._is_survivor(idx):
+            self._played.add(idx)
+            self.n_candidates -= 1
+        self.turns.append(Turn(idx) if hint is None else Turn(idx, self.space.encode_hint(*hint)))
 
+    @instrumented('user_guess')
     def user_guess(self, code: tuple) -> None:
-        """Submit a user guess and save to game history the hint log
+        """Submit a user guess, recording the hint received
 
         Args:
             code (tuple): Submitted user guess
         """
-        self.memorize(code)
         right_locations, wrong_locations = self.get_hint(code)
-        self.history.append(
-            f'''
-            ## **Turn #{self.trials}**<br>
-            ## _Code_: {self.paint(code)}<br>
-            ## _Hint_: {''.join((right_locations*self.hints[0], wrong_locations*self.hints[1]))}
-            ---
-            '''
-            )
+        self.memorize(code, (right_locations, wrong_locations))
         if right_locations == self.N_SLOTS:
             self.success = True
 
+    @instrumented('agent_guess')
     def agent_guess(self) -> None:
-        """Submit an agent guess
-        """
-        guess = self.make_code()
-        self.memorize(guess)
-        self.history.append(
-            dedent(f'''
-            ## **Turn #{self.trials}**<br>
-            ## _Code_: {self.paint(guess)}
-            ''')
+        """Submit an agent guess, its hint is pending until given to `apply_feedback`
+        """
+        self.memorize(self.make_code())
+
+    @property
+    def last_guess(self) -> Optional[tuple]:
+        """Code guessed at the last turn, None before the first one."""
+        return self.omega[self.turns[-1].code] if self.turns else None
+
+    def _is_consistent(self, idx: int) -> bool:
+        """Whether a code could still be the secret, played or not."""
+        if idx in self._played or self._is_survivor(idx):
+            return True
+        if not self._explained:
+            return False
+        # played codes already dropped from the survivors are checked against the scored turns
+        return all(
+            turn.hint == PENDING_HINT or self.space.hints(turn.code, [idx])[0] == turn.hint
+            for turn in self.turns
             )
 
+    def _current_partition(self, guess: int) -> Optional[HintPartition]:
+        """Partition computed for the guess, None if there is none or the candidates changed since."""
+        partition = self._partition
+        if partition is not None and partition.guess == guess and partition.candidates is self.survivors:
+            return partition
+        return None
+
+    def _scan(self, guess: int, hint: int, played: np.ndarray) -> np.ndarray:
+        """Codes of the whole space, the played ones aside, which would produce the hint, walking the space in chunks."""
+        kept = []
+        for chunk in self.space.chunks():
+            kept.append(np.flatnonzero(self.space.hints(guess, chunk) == hint) + chunk.start)
+        survivors = np.concatenate(kept)
+        return survivors[~np.isin(survivors, played)] if len(played) else survivors
+
+    def hint_partition(self) -> Optional[HintPartition]:
+        """Split the candidates by the hint the pending guess would receive.
+
+        Computed once per guess and kept until the candidates change: checking a hint is then O(1)
+        (see `is_coherent`), and `apply_feedback` prunes with the hints scored here. Above
+        MAX_PARTITION_CODES candidates only counts are kept, and pruning walks the space again.
+
+        Returns:
+            Optional[HintPartition]: counts (and hints) of the candidates, None if no guess is waiting for a hint
+        """
+        if not self.turns or self.turns[-1].hint != PENDING_HINT:
+            return None
+        guess = self.turns[-1].code
+        partition = self._current_partition(guess)
+        if partition is not None:
+            return partition
+        if self.survivors is None and self.space.n_codes > MAX_PARTITION_CODES:
+            hints = None
+            counts = sum(
+                np.bincount(self.space.hints(guess, chunk), minlength=self.space.n_hints)
+                for chunk in self.space.chunks()
+                )
+        else:
+            hints = self.space.hints(guess, slice(None) if self.survivors is None else self.survivors)
+            counts = np.bincount(hints, minlength=self.space.n_hints)
+        if self._played:
+            # played codes are not dropped from the survivors until the next pruning
+            counts -= np.bincount(
+                self.space.hints(guess, np.fromiter(self._played, dtype=np.int64)), minlength=self.space.n_hints
+                )
+        counts[self.space.encode_hint(self.N_SLOTS, 0)] = self._is_consistent(guess)
+        self._partition = HintPartition(guess, counts, hints, self.survivors)
+        return self._partition
+
+    def is_coherent(self, hint: tuple) -> bool:
+        """Check a hint for the pending guess before applying it: some candidate must produce it.
+
+        O(1) from the partition of the guess (see `hint_partition`). On spaces too large for one, the codes
+        left by the hint are found instead, in the chunk pass `apply_feedback` would make, and handed over to it.
+
+        Args:
+            hint (tuple): number of right colors in right locations and right colors in wrong locations
+
+        Returns:
+            bool: whether the hint leaves at least one candidate, False if no guess is waiting for a hint
+        """
+        if not self.turns or self.turns[-1].hint != PENDING_HINT or min(hint) < 0 or sum(hint) > self.N_SLOTS:
+            return False
+        guess = self.turns[-1].code
+        if hint[0] == self.N_SLOTS:
+            return self._is_consistent(guess)
+        hint = self.space.encode_hint(*hint)
+        partition = self._current_partition(guess)
+        if partition is None and self.survivors is None and self.space.n_codes > MAX_PARTITION_CODES:
+            # counting every hint would take a pass over the whole space, and `apply_feedback` another one:
+            # only the codes left by this hint are found, in the very pass which prunes them
+            if self._scanned is None or self._scanned[:2] != (guess, hint):
+                self._scanned = (guess, hint, self._scan(guess, hint, np.fromiter(self._played, dtype=np.int64)))
+            return len(self._scanned[2]) > 0
+        if partition is None:
+            partition = self.hint_partition()
+        return bool(partition.counts[hint])
+
+    def render_turn(self, number: int) -> str:
+        """Markdown log of a turn, the hint being left out while pending
+
+        Args:
+            number (int): turn number, starting from 1
+
+        Returns:
+            str: markdown log
+        """
+        turn = self.turns[number - 1]
+        if turn.hint == PENDING_HINT:
+            return dedent(f'''
+            ## **Turn #{number}**<br>
+            ## _Code_: {self.paint(self.omega[turn.code])}
+            ''')
+        right_locations, wrong_locations = self.space.decode_hint(turn.hint)
+        return dedent(f'''
+            ## **Turn #{number}**<br>
+            ## _Code_: {self.paint(self.omega[turn.code])}<br>
+            ## _Hint_: {''.join((right_locations*self.hints[0], wrong_locations*self.hints[1]))}
+            ---
+            ''')
+
+    @instrumented('render_history')
+    def render_history(self, start: int = 1) -> str:
+        """Markdown log of the turns played so far, as a single block
+
+        Args:
+            start (int, optional): number of the first turn to be rendered. Defaults to 1.
+
+        Returns:
+            str: markdown log
+        """
+        return ''.join(self.render_turn(number) for number in range(start, len(self.turns) + 1))
+
+    def turn_distribution(self, strategy: str = 'minimax') -> np.ndarray:
+        """Exact distribution of the turns an agent strategy still needs, over the secrets consistent with the game.
+
+        Subtrees are memoized across games of the process (see `analytics.TurnAnalytics`).
+
+        Args:
+            strategy (str, optional): deterministic agent strategy, a name in `STRATEGIES`. Defaults to 'minimax'.
+
+        Returns:
+            np.ndarray: number of secrets solved in exactly k more turns, for each k
+        """
+        history = [turn.code for turn in self.turns] if self._explained else None
+        return turn_analytics(self.N_SLOTS, self.N_COLORS, strategy, self.space.rules).distribution(self.candidate_indices(), history)
+
+    @instrumented('calculate_win_odds')
     def calculate_win_odds(self) -> float:
         """Calculate win odds for next turn
 
@@ -141,6 +548,127 @@ class MasterMind:
             float: next turn winning odds
         """
         try:
-            return 1.0/len(self.complement(self.memory))
+            return 1.0/self.n_candidates
         except ZeroDivisionError:
-            return 1.0
\ No newline at end of file
+            return 1.0
+
+    def _turn_dtype(self) -> np.dtype:
+        code = '<u4' if self.space.n_codes <= 1 << 32 else '<u8'
+        return np.dtype([('code', code), ('hint', 'u1')])
+
+    def snapshot_size(self) -> int:
+        """Size of the snapshot of the game, see `to_bytes`.
+
+        Returns:
+            int: size in bytes
+        """
+        return _SNAPSHOT_HEADER.size + self._turn_dtype().itemsize*len(self.turns) + (self.space.n_codes + 7)//8
+
+    def to_bytes(self, out: Optional[memoryview] = None) -> Union[bytes, memoryview]:
+        """Serialize the game state in a compact, versioned binary format.
+
+        The snapshot holds the secret, the turns as code-index/hint-byte pairs and the candidate bitset,
+        so its size only depends on the board and the number of turns. Strategy, opening book, hooks and
+        random generator are not part of it, they are given back to `from_bytes`.
+
+        Args:
+            out (Optional[memoryview], optional): writable buffer of at least `snapshot_size()` bytes (e.g. shared memory) to write into, without intermediate copies, ValueError if smaller. Defaults to None.
+
+        Returns:
+            Union[bytes, memoryview]: the snapshot, as a new bytes object or as the written part of `out`
+        """
+        size = self.snapshot_size()
+        if out is not None:
+            out = memoryview(out).cast('B')
+            if len(out) < size:
+                raise ValueError(f'Snapshot needs {size} bytes, the buffer only has {len(out)}')
+        buffer = memoryview(bytearray(size)) if out is None else out[:size]
+        flags = (
+            (_SNAPSHOT_SUCCESS if self.success else 0) | (_SNAPSHOT_EXPLAINED if self._explained else 0)
+            | _SNAPSHOT_VARIANTS.index(self.variant) << _SNAPSHOT_VARIANT_SHIFT
+            )
+        dtype = self._turn_dtype()
+        _SNAPSHOT_HEADER.pack_into(
+            buffer, 0,
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.N_SLOTS, self.N_COLORS, flags, dtype['code'].itemsize,
+            len(self.turns), self.trials, self.space.index(self.secret_code),
+            -1 if self.user_code is None else self.space.index(self.user_code),
+            -1 if self.book_node is None else self.book_node,
+            )
+        offset = _SNAPSHOT_HEADER.size
+        turns = np.frombuffer(buffer, dtype=dtype, count=len(self.turns), offset=offset)
+        turns['code'] = [turn.code for turn in self.turns]
+        turns['hint'] = [turn.hint for turn in self.turns]
+        offset += turns.nbytes
+        bits = np.frombuffer(buffer, dtype=np.uint8, offset=offset)
+        candidates = self.candidate_indices()
+        if isinstance(candidates, range):
+            bits[:] = 0xFF
+            bits[-1] = (1 << (self.space.n_codes - 8*(len(bits) - 1))) - 1
+        else:
+            # chunk by chunk, so that no mask over the whole space is ever allocated
+            bounds = np.searchsorted(candidates, [chunk.start for chunk in self.space.chunks()] + [self.space.n_codes])
+            for k, chunk in enumerate(self.space.chunks()):
+                mask = np.zeros(chunk.stop - chunk.start, dtype=bool)
+                mask[candidates[bounds[k]:bounds[k + 1]] - chunk.start] = True
+                bits[chunk.start//8:(chunk.stop + 7)//8] = np.packbits(mask, bitorder='little')
+        return bytes(buffer) if out is None else buffer
+
+    @classmethod
+    def from_bytes(
+        cls,
+        data: Union[bytes, bytearray, memoryview],
+        strategy: Union[str, Callable] = 'random',
+        rng: Union[int, random.Random, None] = None,
+        book: Optional[OpeningBook] = None,
+        hooks: Optional[Iterable[Hook]] = None
+        ) -> 'MasterMind':
+        """Restore a game serialized by `to_bytes`, reading the buffer in place.
+
+        Args:
+            data (Union[bytes, bytearray, memoryview]): snapshot, or any buffer starting with one
+            strategy (Union[str, Callable], optional): agent guess strategy, a name in `STRATEGIES` or a callable. Defaults to 'random'.
+            rng (Union[int, random.Random, None], optional): random generator, or seed of a new one. Defaults to None.
+            book (Optional[OpeningBook], optional): opening book the game was following, if any. Defaults to None.
+            hooks (Optional[Iterable[Hook]], optional): instrumentation callbacks. Defaults to None.
+
+        Returns:
+            MasterMind: restored game
+        """
+        buffer = memoryview(data).cast('B')
+        (
+            magic, version, N_SLOTS, N_COLORS, flags, code_bytes, n_turns, trials, secret, user_code, book_node
+            ) = _SNAPSHOT_HEADER.unpack_from(buffer, 0)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError('Not a MasterMind snapshot')
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f'Unsupported snapshot version {version}')
+        variant = _SNAPSHOT_VARIANTS[(flags & _SNAPSHOT_VARIANT_MASK) >> _SNAPSHOT_VARIANT_SHIFT]
+        game = cls(N_SLOTS, N_COLORS, strategy=strategy, rng=rng, book=book, hooks=hooks, variant=variant)
+        dtype = game._turn_dtype()
+        size = _SNAPSHOT_HEADER.size + dtype.itemsize*n_turns + (game.space.n_codes + 7)//8
+        if dtype['code'].itemsize != code_bytes or len(buffer) < size:
+            raise ValueError('Truncated or corrupted snapshot')
+
+        offset = _SNAPSHOT_HEADER.size
+        turns = np.frombuffer(buffer, dtype=dtype, count=n_turns, offset=offset)
+        game.turns = [Turn(int(code), int(hint)) for code, hint in zip(turns['code'].tolist(), turns['hint'].tolist())]
+        offset += turns.nbytes
+        bits = np.frombuffer(buffer, dtype=np.uint8, count=(game.space.n_codes + 7)//8, offset=offset)
+        survivors = [
+            np.flatnonzero(np.unpackbits(bits[chunk.start//8:(chunk.stop + 7)//8], count=chunk.stop - chunk.start, bitorder='little')) + chunk.start
+            for chunk in game.space.chunks()
+            ]
+        game.survivors = np.concatenate(survivors)
+        game.n_candidates = len(game.survivors)
+        if game.n_candidates == game.space.n_codes:
+            game.survivors = None
+
+        game.trials = trials
+        game.secret_code = game.space.decode(secret)
+        game.user_code = None if user_code < 0 else game.space.decode(user_code)
+        game.success = bool(flags & _SNAPSHOT_SUCCESS)
+        game._explained = bool(flags & _SNAPSHOT_EXPLAINED)
+        game.book_node = book_node if book is not None and book_node >= 0 else None
+        return game
+
@@ -0,0 +1,173 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable, NamedTuple, Optional, Union
+
+from mastermind.core.book import opening_book
+from mastermind.core.mastermind import MasterMind
+
+'''
+Server-side registry of the games of every session.
+
+Each session owns one game per board configuration and variant, so that concurrent users never share a mutable
+game and resetting one session leaves the others alone. Code space tables are shared by every game
+of the process (see `scoring.code_space`) and are not accounted for here, only per-game state is.
+
+Environment variables:
+    MASTERMIND_REGISTRY_MAX_BYTES: memory bound of the games held, defaults to 256 MiB
+    MASTERMIND_REGISTRY_MAX_IDLE: seconds after which an unused game is dropped, defaults to 1800
+'''
+
+DEFAULT_MAX_BYTES = 1 << 28
+DEFAULT_MAX_IDLE = 1800.0
+
+
+def game_factory(strategy: Union[str, Callable] = 'random', **kwargs) -> Callable[..., MasterMind]:
+    """Factory of the games of a registry, following the opening book of their strategy when one has been built.
+
+    Args:
+        strategy (Union[str, Callable], optional): agent guess strategy, a name in `STRATEGIES` or a callable. Defaults to 'random'.
+        kwargs: other arguments of every new `MasterMind`, e.g. hooks
+
+    Returns:
+        Callable[..., MasterMind]: builds a new game from N_SLOTS, N_COLORS and variant
+    """
+    def factory(N_SLOTS: int, N_COLORS: int, variant: str = 'classic') -> MasterMind:
+        # books of random agents would make them deterministic
+        book = opening_book(N_SLOTS, N_COLORS, strategy, variant) if isinstance(strategy, str) and strategy != 'random' else None
+        return MasterMind(N_SLOTS, N_COLORS, strategy=strategy, book=book, variant=variant, **kwargs)
+    return factory
+
+
+class _Entry(NamedTuple):
+    game: MasterMind
+    last_used: float
+    nbytes: int
+
+
+class GameRegistry:
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        max_idle: Optional[float] = None,
+        factory: Callable[..., MasterMind] = MasterMind,
+        clock: Callable[[], float] = time.monotonic
+        ) -> None:
+        """Initialize class.
+
+        Args:
+            max_bytes (Optional[int], optional): memory bound of the games held, least recently used ones are evicted beyond it. Defaults to MASTERMIND_REGISTRY_MAX_BYTES.
+            max_idle (Optional[float], optional): seconds after which an unused game expires. Defaults to MASTERMIND_REGISTRY_MAX_IDLE.
+            factory (Callable[..., MasterMind], optional): builds a new game from N_SLOTS, N_COLORS and variant. Defaults to MasterMind.
+            clock (Callable[[], float], optional): time source, in seconds. Defaults to time.monotonic.
+        """
+        if max_bytes is None:
+            max_bytes = int(os.environ.get('MASTERMIND_REGISTRY_MAX_BYTES', DEFAULT_MAX_BYTES))
+        if max_idle is None:
+            max_idle = float(os.environ.get('MASTERMIND_REGISTRY_MAX_IDLE', DEFAULT_MAX_IDLE))
+        self.max_bytes = max_bytes
+        self.max_idle = max_idle
+        self.factory = factory
+        self.clock = clock
+        self.nbytes = 0
+        # least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, session_id: Hashable) -> bool:
+        return any(key[0] == session_id for key in self._entries)
+
+    def get(
+        self,
+        session_id: Hashable,
+        N_SLOTS: int,
+        N_COLORS: int,
+        variant: str = 'classic',
+        create: bool = True
+        ) -> Optional[MasterMind]:
+        """Game of a session for the given board, created on first access.
+
+        The memory held by the game is measured again on every access, then expired and least
+        recently used games of any session are dropped until the registry fits its bound;
+        the requested game is never dropped.
+
+        Args:
+            session_id (Hashable): identifier of the session
+            N_SLOTS (int): length of code
+            N_COLORS (int): number of distinct available colors
+            variant (str, optional): game variant, a name in `scoring.VARIANTS`. Defaults to 'classic'.
+            create (bool, optional): whether to start a new game if the session has none, else return None. Defaults to True.
+
+        Returns:
+            Optional[MasterMind]: game instance owned by the session
+        """
+        key = (session_id, N_SLOTS, N_COLORS, variant)
+        with self._lock:
+            now = self.clock()
+            entry = self._entries.pop(key, None)
+            if entry is not None and now - entry.last_used > self.max_idle:
+                # expired but not collected yet, as if it had been
+                self.nbytes -= entry.nbytes
+                entry = None
+            if entry is None and not create:
+                return None
+            game = self.factory(N_SLOTS=N_SLOTS, N_COLORS=N_COLORS, variant=variant) if entry is None else entry.game
+            self._store(key, game, now, entry)
+            self._expire(now)
+            self._evict(keep=key)
+            return game
+
+    def touch(self, session_id: Hashable, N_SLOTS: int, N_COLORS: int, variant: str = 'classic') -> None:
+        """Account again for the memory of a game after it has been played, if still registered."""
+        key = (session_id, N_SLOTS, N_COLORS, variant)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self._store(key, entry.game, self.clock(), entry)
+                self._evict(keep=key)
+
+    def reset(self, session_id: Hashable) -> None:
+        """Drop every game of a session, the next access starts a new one."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == session_id]:
+                self.nbytes -= self._entries.pop(key).nbytes
+
+    def expire(self) -> int:
+        """Drop games unused for longer than `max_idle`.
+
+        Returns:
+            int: number of games dropped
+        """
+        with self._lock:
+            return self._expire(self.clock())
+
+    def _store(self, key: tuple, game: MasterMind, now: float, previous: Optional[_Entry]) -> None:
+        if previous is not None:
+            self.nbytes -= previous.nbytes
+        entry = _Entry(game, now, game.nbytes)
+        self._entries[key] = entry
+        self.nbytes += entry.nbytes
+
+    def _expire(self, now: float) -> int:
+        expired = 0
+        # entries are ordered by last use, stop at the first one still alive
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if now - entry.last_used <= self.max_idle:
+                break
+            del self._entries[key]
+            self.nbytes -= entry.nbytes
+            expired += 1
+        return expired
+
+    def _evict(self, keep: tuple) -> None:
+        for key in list(self._entries):
+            if self.nbytes <= self.max_bytes:
+                break
+            if key != keep:
+                self.nbytes -= self._entries.pop(key).nbytes
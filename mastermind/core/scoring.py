@@ -0,0 +1,433 @@
+import math
+import random
+from functools import lru_cache
+from typing import Iterator, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+from mastermind.core.cache import cached
+
+# Above this many codes the full pairwise table no longer fits comfortably in memory
+# (6**5 codes -> ~60 MB), so hints are scored on the fly by the vectorized kernel.
+MAX_TABLE_CODES = 6**5
+# Number of codes decoded at once when walking spaces too large to be materialized.
+CHUNK_CODES = 1 << 20
+
+
+class Variant(NamedTuple):
+    """Rules of a game variant."""
+
+    repeats: bool
+    whites: bool
+
+
+# Game variants: whether a code may hold the same color twice, and whether hints count white pegs.
+# Bulls & Cows is the no-repeat game, bulls and cows being black and white pegs.
+VARIANTS = {
+    'classic': Variant(repeats=True, whites=True),
+    'no_repeat': Variant(repeats=False, whites=True),
+    'bulls_cows': Variant(repeats=False, whites=True),
+    'black_only': Variant(repeats=True, whites=False),
+    }
+
+
+class CodeSpace(Sequence):
+
+    # whether codes may repeat colors, see `PermutationSpace` otherwise
+    repeats = True
+
+    def __init__(self, N_SLOTS: int, N_COLORS: int, whites: bool = True) -> None:
+        """Immutable code space for a board configuration, shared by all games.
+
+        Codes are indexed in `itertools.product` order, i.e. as mixed-radix integers
+        whose most significant digit is the first slot, and decoded to tuples on demand:
+        nothing proportional to the number of codes is allocated until a solver needs it.
+        Hints are encoded as a single byte, `black * (N_SLOTS + 1) + white`.
+
+        Args:
+            N_SLOTS (int): length of code
+            N_COLORS (int): number of distinct available colors
+            whites (bool, optional): whether hints count white pegs, otherwise white is always 0. Defaults to True.
+        """
+        self.N_SLOTS = N_SLOTS
+        self.N_COLORS = N_COLORS
+        self.whites = whites
+        self.n_codes = N_COLORS**N_SLOTS
+        self.n_hints = (N_SLOTS + 1)**2
+        self.weights = N_COLORS**np.arange(N_SLOTS - 1, -1, -1, dtype=np.int64)
+        self._digits = None
+        self._table = None
+        self._openings = None
+
+    def __len__(self) -> int:
+        return self.n_codes
+
+    def __getitem__(self, index: int) -> tuple:
+        if not -self.n_codes <= index < self.n_codes:
+            raise IndexError('code index out of range')
+        return self.decode(index % self.n_codes)
+
+    def __contains__(self, code: object) -> bool:
+        return (
+            isinstance(code, tuple) and len(code) == self.N_SLOTS
+            and all(isinstance(digit, int) and 0 <= digit < self.N_COLORS for digit in code)
+            )
+
+    @property
+    def codes(self) -> np.ndarray:
+        """Every code of the space as an (n_codes, N_SLOTS) array, materialized on first access.
+
+        Returns:
+            np.ndarray: all codes
+        """
+        if self._digits is None:
+            self._digits = self.digits(slice(None))
+        return self._digits.T
+
+    @property
+    def table(self) -> Optional[np.ndarray]:
+        """Pairwise score table, loaded from the persistent cache (or built) on first access.
+
+        Returns:
+            Optional[np.ndarray]: uint8 matrix of encoded hints, None if the space is too large
+        """
+        if self._table is None and self.n_codes <= MAX_TABLE_CODES:
+            self._table = cached('score_table', self.key, lambda: score(self.codes.T, self.codes.T, self.N_COLORS, self.whites))
+        return self._table
+
+    @property
+    def openings(self) -> Optional[np.ndarray]:
+        """Hint-partition histogram of every opening guess against the whole space, cached as the score table.
+
+        Returns:
+            Optional[np.ndarray]: (n_codes, n_hints) int32 matrix, None if the space is too large
+        """
+        if self._openings is None and self.table is not None:
+            everything = np.arange(self.n_codes)
+            self._openings = cached(
+                'openings', self.key,
+                lambda: self.partition_counts(everything, everything).astype(np.int32)
+                )
+        return self._openings
+
+    @property
+    def rules(self) -> Variant:
+        """Rules of the variant played on this space."""
+        return Variant(self.repeats, self.whites)
+
+    @property
+    def key(self) -> str:
+        """Name of the board configuration and rules, e.g. in cache file names."""
+        return f'{self.N_SLOTS}x{self.N_COLORS}' + ('' if self.repeats else '-distinct') + ('' if self.whites else '-black')
+
+    def encode_hint(self, right_locations: int, wrong_locations: int) -> int:
+        """Encode a (black, white) hint into a single byte."""
+        return right_locations*(self.N_SLOTS + 1) + wrong_locations
+
+    def decode_hint(self, hint: int) -> tuple:
+        """Decode a hint byte back into (black, white)."""
+        return divmod(int(hint), self.N_SLOTS + 1)
+
+    def index(self, code: Sequence[int]) -> int:
+        """Mixed-radix index of a code."""
+        idx = 0
+        for digit in code:
+            idx = idx*self.N_COLORS + int(digit)
+        return idx
+
+    def index_many(self, codes: Sequence[Sequence[int]]) -> np.ndarray:
+        """Mixed-radix indices of several codes at once."""
+        return np.asarray(codes, dtype=np.int64).reshape(-1, self.N_SLOTS) @ self.weights
+
+    def decode(self, index: int) -> tuple:
+        """Code corresponding to a mixed-radix index."""
+        code = []
+        for _ in range(self.N_SLOTS):
+            index, digit = divmod(int(index), self.N_COLORS)
+            code.append(digit)
+        return tuple(reversed(code))
+
+    def decode_many(self, indices: np.ndarray) -> np.ndarray:
+        """Codes corresponding to several indices, as an (n, N_SLOTS) uint8 array."""
+        return self.digits(np.asarray(indices)).T
+
+    def digits(self, indices: Union[slice, np.ndarray]) -> np.ndarray:
+        """Slot-major digits of the given codes, as used by the scoring kernel.
+
+        Args:
+            indices (Union[slice, np.ndarray]): code indices
+
+        Returns:
+            np.ndarray: (N_SLOTS, n) uint8 array
+        """
+        if self._digits is not None:
+            return self._digits[:, indices]
+        dtype = np.uint32 if self.n_codes <= 1 << 32 else np.uint64
+        if isinstance(indices, slice):
+            rest = np.arange(*indices.indices(self.n_codes), dtype=dtype)
+        else:
+            rest = np.array(indices, dtype=dtype)
+        out = np.empty((self.N_SLOTS, len(rest)), dtype=np.uint8)
+        radix = dtype(self.N_COLORS)
+        for slot in range(self.N_SLOTS - 1, -1, -1):
+            out[slot] = rest % radix
+            rest //= radix
+        return out
+
+    def random_index(self, rng: random.Random = random) -> int:
+        """Index of a uniformly random code, in O(1)."""
+        return rng.randrange(self.n_codes)
+
+    def chunks(self, chunk: int = CHUNK_CODES) -> Iterator[slice]:
+        """Split the index range of the space into slices of at most `chunk` codes."""
+        for start in range(0, self.n_codes, chunk):
+            yield slice(start, min(start + chunk, self.n_codes))
+
+    def hints(self, guess: int, candidates: Union[slice, np.ndarray, None] = None) -> np.ndarray:
+        """Score one guess against many codes.
+
+        Args:
+            guess (int): index of the guessed code
+            candidates (Union[slice, np.ndarray, None], optional): indices of the codes to score against. Defaults to the whole space.
+
+        Returns:
+            np.ndarray: encoded hints, one per candidate
+        """
+        if candidates is None:
+            candidates = slice(None)
+        if self.table is not None:
+            return self.table[guess, candidates]
+        return self.hint_matrix(np.array([guess]), candidates)[0]
+
+    def hint_matrix(self, guesses: np.ndarray, candidates: Union[slice, np.ndarray]) -> np.ndarray:
+        """Score many guesses against many codes.
+
+        Args:
+            guesses (np.ndarray): indices of the guessed codes
+            candidates (Union[slice, np.ndarray]): indices of the codes to score against
+
+        Returns:
+            np.ndarray: (len(guesses), len(candidates)) matrix of encoded hints
+        """
+        if self.table is not None:
+            if isinstance(candidates, slice):
+                return self.table[guesses, candidates]
+            return self.table[np.ix_(guesses, candidates)]
+        return score(self.digits(np.asarray(guesses)), self.digits(candidates), self.N_COLORS, self.whites)
+
+    def partition_counts(self, guesses: np.ndarray, candidates: np.ndarray, chunk: int = 1 << 22) -> np.ndarray:
+        """Hint-partition histogram of every guess against the candidate set.
+
+        Args:
+            guesses (np.ndarray): indices of the guesses to be evaluated
+            candidates (np.ndarray): indices of the codes still consistent with the game
+            chunk (int, optional): maximum number of pairs scored at once. Defaults to 1 << 22.
+
+        Returns:
+            np.ndarray: (len(guesses), n_hints) matrix, how many candidates fall in each hint bucket
+        """
+        counts = np.empty((len(guesses), self.n_hints), dtype=np.int64)
+        rows = max(1, chunk // max(1, len(candidates)))
+        for start in range(0, len(guesses), rows):
+            block = guesses[start:start + rows]
+            offsets = np.arange(len(block), dtype=np.int64)[:, None]*self.n_hints
+            hints = self.hint_matrix(block, candidates) + offsets
+            counts[start:start + len(block)] = np.bincount(
+                hints.ravel(), minlength=len(block)*self.n_hints
+                ).reshape(len(block), self.n_hints)
+        return counts
+
+    def pair_hints(self, guesses: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Score guesses against codes pairwise, i.e. the i-th guess against the i-th code only.
+
+        Args:
+            guesses (np.ndarray): indices of the guessed codes
+            codes (np.ndarray): indices of the codes to score against, same length as guesses
+
+        Returns:
+            np.ndarray: encoded hints, one per pair
+        """
+        if self.table is not None:
+            return self.table[guesses, codes]
+        return score_pairs(self.digits(np.asarray(guesses)), self.digits(np.asarray(codes)), self.N_COLORS, self.whites)
+
+
+class PermutationSpace(CodeSpace):
+
+    repeats = False
+
+    def __init__(self, N_SLOTS: int, N_COLORS: int, whites: bool = True) -> None:
+        """Code space of the variants where a code never holds the same color twice.
+
+        Codes are indexed in `itertools.permutations` order: the index of a code is its Lehmer code,
+        the rank of each color among the ones not used by the previous slots, read as a mixed-radix
+        integer whose weights are the numbers of arrangements of the remaining slots.
+        Digits, scoring and caching are inherited, so every variant runs on the same kernel and tables.
+
+        Args:
+            N_SLOTS (int): length of code
+            N_COLORS (int): number of distinct available colors, at least N_SLOTS
+            whites (bool, optional): whether hints count white pegs, otherwise white is always 0. Defaults to True.
+        """
+        if N_COLORS < N_SLOTS:
+            raise ValueError(f'Codes of {N_SLOTS} distinct colors need at least {N_SLOTS} colors, not {N_COLORS}')
+        super().__init__(N_SLOTS, N_COLORS, whites)
+        self.n_codes = math.perm(N_COLORS, N_SLOTS)
+        self.weights = np.array(
+            [math.perm(N_COLORS - 1 - slot, N_SLOTS - 1 - slot) for slot in range(N_SLOTS)], dtype=np.int64
+            )
+
+    def __contains__(self, code: object) -> bool:
+        return super().__contains__(code) and len(set(code)) == self.N_SLOTS
+
+    def index(self, code: Sequence[int]) -> int:
+        """Lehmer code of a code."""
+        idx, used = 0, []
+        for digit, weight in zip(code, self.weights.tolist()):
+            digit = int(digit)
+            idx += (digit - sum(color < digit for color in used))*weight
+            used.append(digit)
+        return idx
+
+    def index_many(self, codes: Sequence[Sequence[int]]) -> np.ndarray:
+        """Lehmer codes of several codes at once."""
+        codes = np.asarray(codes, dtype=np.int64).reshape(-1, self.N_SLOTS)
+        ranks = codes.copy()
+        for slot in range(1, self.N_SLOTS):
+            ranks[:, slot] -= (codes[:, :slot] < codes[:, slot, None]).sum(axis=1)
+        return ranks @ self.weights
+
+    def decode(self, index: int) -> tuple:
+        """Code corresponding to a Lehmer code."""
+        index, available, code = int(index), list(range(self.N_COLORS)), []
+        for weight in self.weights.tolist():
+            rank, index = divmod(index, weight)
+            code.append(available.pop(rank))
+        return tuple(code)
+
+    def digits(self, indices: Union[slice, np.ndarray]) -> np.ndarray:
+        """Slot-major digits of the given codes, as used by the scoring kernel.
+
+        Args:
+            indices (Union[slice, np.ndarray]): code indices
+
+        Returns:
+            np.ndarray: (N_SLOTS, n) uint8 array
+        """
+        if self._digits is not None:
+            return self._digits[:, indices]
+        if isinstance(indices, slice):
+            rest = np.arange(*indices.indices(self.n_codes), dtype=np.int64)
+        else:
+            rest = np.array(indices, dtype=np.int64)
+        out = np.empty((self.N_SLOTS, len(rest)), dtype=np.uint8)
+        columns = np.arange(len(rest))
+        used = np.zeros((self.N_COLORS, len(rest)), dtype=bool)
+        for slot, weight in enumerate(self.weights.tolist()):
+            rank = rest // weight
+            rest -= rank*weight
+            # the color of rank r is the one preceded by exactly r unused colors
+            free = np.cumsum(~used, axis=0, dtype=np.uint8)
+            out[slot] = (free <= rank.astype(np.uint8)).sum(axis=0)
+            used[out[slot], columns] = True
+        return out
+
+
+def color_counts(digits: np.ndarray, color: int) -> np.ndarray:
+    """Count occurrences of a color in every code.
+
+    Args:
+        digits (np.ndarray): (N_SLOTS, n) slot-major array of codes
+        color (int): color to be counted
+
+    Returns:
+        np.ndarray: (n,) uint8 array of counts
+    """
+    counts = np.zeros(digits.shape[1], dtype=np.uint8)
+    for slot in digits:
+        counts += slot == color
+    return counts
+
+
+def score(guesses: np.ndarray, codes: np.ndarray, N_COLORS: int, whites: bool = True, chunk: int = 1 << 22) -> np.ndarray:
+    """Vectorized scoring kernel: same semantics as `MasterMind.get_hint`, for every pair.
+
+    Inputs are slot-major, so that every pass of the kernel runs over contiguous memory;
+    color counts of the codes are only computed for colors appearing in some guess.
+
+    Args:
+        guesses (np.ndarray): (N_SLOTS, g) array of guesses
+        codes (np.ndarray): (N_SLOTS, n) array of codes to check against
+        N_COLORS (int): number of distinct available colors
+        whites (bool, optional): whether white pegs are counted, black-only variants skip the color pass. Defaults to True.
+        chunk (int, optional): maximum number of pairs scored at once, bounds temporary memory. Defaults to 1 << 22.
+
+    Returns:
+        np.ndarray: (g, n) uint8 matrix of encoded hints
+    """
+    N_SLOTS, n = codes.shape
+    weight = np.uint8(N_SLOTS if whites else N_SLOTS + 1)
+    guess_counts = np.stack([color_counts(guesses, color) for color in range(N_COLORS)]) if whites else None
+    code_counts = {}
+    out = np.empty((guesses.shape[1], n), dtype=np.uint8)
+    rows = max(1, chunk // max(1, n))
+    for start in range(0, guesses.shape[1], rows):
+        g = slice(start, start + rows)
+        block = out[g]
+        # black pegs are weighted by N_SLOTS so that adding the common colors yields black * (N_SLOTS + 1) + white
+        block[...] = 0
+        for slot in range(N_SLOTS):
+            block += (guesses[slot, g, None] == codes[slot, None, :])*weight
+        if not whites:
+            continue
+        for color in np.flatnonzero(guess_counts[:, g].any(axis=1)):
+            if color not in code_counts:
+                code_counts[color] = color_counts(codes, color)
+            block += np.minimum(guess_counts[color, g, None], code_counts[color][None, :])
+    return out
+
+
+def score_pairs(guesses: np.ndarray, codes: np.ndarray, N_COLORS: int, whites: bool = True) -> np.ndarray:
+    """Elementwise counterpart of `score`: the i-th guess is only checked against the i-th code.
+
+    Args:
+        guesses (np.ndarray): (N_SLOTS, n) array of guesses
+        codes (np.ndarray): (N_SLOTS, n) array of codes to check against
+        N_COLORS (int): number of distinct available colors
+        whites (bool, optional): whether white pegs are counted. Defaults to True.
+
+    Returns:
+        np.ndarray: (n,) uint8 array of encoded hints
+    """
+    N_SLOTS = codes.shape[0]
+    weight = np.uint8(N_SLOTS if whites else N_SLOTS + 1)
+    out = np.zeros(codes.shape[1], dtype=np.uint8)
+    for slot in range(N_SLOTS):
+        out += (guesses[slot] == codes[slot])*weight
+    if whites:
+        for color in range(N_COLORS):
+            out += np.minimum(color_counts(guesses, color), color_counts(codes, color))
+    return out
+
+
+def code_space(N_SLOTS: int, N_COLORS: int, variant: Union[str, Variant] = 'classic') -> CodeSpace:
+    """Return the (process-wide cached) code space of a board configuration.
+
+    Args:
+        N_SLOTS (int): length of code
+        N_COLORS (int): number of distinct available colors
+        variant (Union[str, Variant], optional): game variant, a name in `VARIANTS` or its rules. Defaults to 'classic'.
+
+    Returns:
+        CodeSpace: shared code space, the same for variants with the same rules
+    """
+    if isinstance(variant, str):
+        if variant not in VARIANTS:
+            raise ValueError(f'Unknown variant {variant!r}, expected one of {", ".join(VARIANTS)}')
+        variant = VARIANTS[variant]
+    return _code_space(N_SLOTS, N_COLORS, variant)
+
+
+@lru_cache(maxsize=None)
+def _code_space(N_SLOTS: int, N_COLORS: int, rules: Variant) -> CodeSpace:
+    return (CodeSpace if rules.repeats else PermutationSpace)(N_SLOTS, N_COLORS, rules.whites)
@@ -0,0 +1,163 @@
+import random
+import time
+import argparse
+import tracemalloc
+from functools import partial
+from typing import Callable, NamedTuple, Optional, Union
+
+import numpy as np
+
+from mastermind.core.scoring import VARIANTS, CodeSpace, code_space
+from mastermind.core.strategies import STRATEGIES, random_guess
+
+'''
+Headless batch simulator: plays many games in lockstep, one turn of every game at a time.
+'''
+
+
+class SimulationReport(NamedTuple):
+    """Outcome of a batch simulation."""
+
+    turns: np.ndarray
+    seconds: float
+    peak_memory: Optional[int]
+
+    @property
+    def distribution(self) -> np.ndarray:
+        """Number of games solved in exactly k turns, for each k (unsolved games are left out)."""
+        return np.bincount(self.turns[self.turns > 0])
+
+    @property
+    def games_per_second(self) -> float:
+        return len(self.turns)/self.seconds if self.seconds else float('inf')
+
+    def summary(self) -> str:
+        """Human readable summary of the report."""
+        solved = self.turns[self.turns > 0]
+        lines = [
+            f'games: {len(self.turns)} ({len(self.turns) - len(solved)} unsolved)',
+            f'mean turns: {solved.mean():.4f}' if len(solved) else 'mean turns: -',
+            f'games/s: {self.games_per_second:.1f}',
+            ]
+        if self.peak_memory is not None:
+            lines.append(f'peak memory: {self.peak_memory/2**20:.1f} MiB')
+        lines.extend(f'  {k} turns: {n}' for k, n in enumerate(self.distribution) if n)
+        return '\n'.join(lines)
+
+
+def _random_guesses(masks: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Draw one candidate uniformly from every row of a batch of candidate masks."""
+    ranks = np.cumsum(masks, axis=1, dtype=np.int32)
+    draws = (rng.random(len(masks))*ranks[:, -1]).astype(np.int32)
+    return np.argmax(ranks > draws[:, None], axis=1)
+
+
+def _strategy_guesses(
+    space: CodeSpace,
+    masks: np.ndarray,
+    played: np.ndarray,
+    strategy: Callable,
+    rng: random.Random
+    ) -> np.ndarray:
+    """Run a (deterministic) strategy once per distinct candidate set of the batch.
+
+    The history of any game of a group explains the shared candidate set, so the first one is used.
+    """
+    packed = np.packbits(masks, axis=1)
+    _, first, inverse = np.unique(packed, axis=0, return_index=True, return_inverse=True)
+    choices = np.array([strategy(space, np.flatnonzero(masks[k]), rng, played[k].tolist()) for k in first])
+    return choices[inverse.ravel()]
+
+
+def simulate(
+    N_SLOTS: int = 4,
+    N_COLORS: int = 6,
+    n_games: int = 1000,
+    strategy: Union[str, Callable] = 'random',
+    rng: Union[int, random.Random, None] = None,
+    max_turns: Optional[int] = None,
+    batch: int = 1 << 24,
+    trace_memory: bool = True,
+    variant: str = 'classic'
+    ) -> SimulationReport:
+    """Play many games in lockstep, with the agent as CodeBreaker.
+
+    Every turn, a guess is chosen for each unsolved game, all guesses are scored against
+    their secrets at once and every candidate mask is narrowed by one vectorized comparison.
+
+    Args:
+        N_SLOTS (int, optional): length of code. Defaults to 4.
+        N_COLORS (int, optional): number of distinct available colors. Defaults to 6.
+        n_games (int, optional): number of games. Defaults to 1000.
+        strategy (Union[str, Callable], optional): agent guess strategy, a name in `STRATEGIES` or a callable. Defaults to 'random'.
+        rng (Union[int, random.Random, None], optional): random generator, or seed of a new one. Defaults to None.
+        max_turns (Optional[int], optional): games still unsolved after this many turns are given up. Defaults to None.
+        batch (int, optional): maximum number of (game, code) cells pruned at once, bounds temporary memory. Defaults to 1 << 24.
+        trace_memory (bool, optional): whether to measure peak memory through tracemalloc. Defaults to True.
+        variant (str, optional): game variant, a name in `VARIANTS`. Defaults to 'classic'.
+
+    Returns:
+        SimulationReport: turns needed by each game (0 if unsolved), elapsed time and peak memory
+    """
+    space = code_space(N_SLOTS, N_COLORS, variant)
+    strategy = STRATEGIES[strategy] if isinstance(strategy, str) else strategy
+    rng = rng if isinstance(rng, random.Random) else random.Random(rng)
+    np_rng = np.random.default_rng(rng.getrandbits(64))
+    win = space.encode_hint(N_SLOTS, 0)
+
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+
+    secrets = np_rng.integers(space.n_codes, size=n_games)
+    masks = np.ones((n_games, space.n_codes), dtype=bool)
+    turns = np.zeros(n_games, dtype=np.int64)
+    played = np.zeros((n_games, 0), dtype=np.int64)
+    active = np.arange(n_games)
+    turn = 0
+    while len(active) and (max_turns is None or turn < max_turns):
+        turn += 1
+        if strategy is random_guess:
+            guesses = _random_guesses(masks[active], np_rng)
+        else:
+            guesses = _strategy_guesses(space, masks[active], played[active], strategy, rng)
+        hints = space.pair_hints(guesses, secrets[active])
+        rows = max(1, batch // space.n_codes)
+        for k in range(0, len(active), rows):
+            games = active[k:k + rows]
+            masks[games] &= space.hint_matrix(guesses[k:k + rows], slice(None)) == hints[k:k + rows, None]
+        masks[active, guesses] = False
+        played = np.concatenate([played, np.zeros((n_games, 1), dtype=np.int64)], axis=1)
+        played[active, -1] = guesses
+        solved = hints == win
+        turns[active[solved]] = turn
+        active = active[~solved]
+
+    seconds = time.perf_counter() - start
+    peak_memory = None
+    if trace_memory:
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return SimulationReport(turns, seconds, peak_memory)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Play many MasterMind games headlessly and report turns to solve.')
+    parser.add_argument('--slots', type=int, default=4, help='length of code')
+    parser.add_argument('--colors', type=int, default=6, help='number of distinct available colors')
+    parser.add_argument('--games', type=int, default=1000, help='number of games')
+    parser.add_argument('--strategy', default='random', choices=sorted(STRATEGIES), help='agent guess strategy')
+    parser.add_argument('--seed', type=int, default=None, help='random seed')
+    parser.add_argument('--max-turns', type=int, default=None, help='give up games after this many turns')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes scoring exhaustive strategies')
+    parser.add_argument('--variant', default='classic', choices=list(VARIANTS), help='game variant')
+    args = parser.parse_args()
+    strategy = STRATEGIES[args.strategy]
+    if args.workers and strategy is not random_guess:
+        strategy = partial(strategy, workers=args.workers)
+    report = simulate(args.slots, args.colors, args.games, strategy, args.seed, args.max_turns, variant=args.variant)
+    print(report.summary())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,468 @@
+import time
+import atexit
+import random
+from functools import lru_cache
+from math import gcd
+from statistics import NormalDist
+from typing import TYPE_CHECKING, Callable, Iterator, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from mastermind.core.scoring import CHUNK_CODES, CodeSpace, Variant, code_space
+from mastermind.core.symmetry import opening_representatives, representatives
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+'''
+Guess strategies for the agent CodeBreaker.
+
+A strategy is any callable `strategy(space, candidates, rng, history) -> int` returning the index
+of the next guess, given the code space, the sorted indices of the codes still consistent with the game
+(a `range` while none has been ruled out), the game random generator and the indices of the guesses
+scored so far (None when the candidate set is not fully explained by them, e.g. after editing memory).
+
+Exhaustive strategies accept a `workers` option (e.g. through `functools.partial`) to shard the
+candidate guesses across a process pool; the score table is handed to workers through shared memory.
+
+`Anytime` bounds the latency of a guess instead: it refines a cheap guess until a deadline, which
+makes it usable on boards too large for exhaustive search (it is not deterministic, hence not in `STRATEGIES`).
+The `sampled` strategy trades exactness for speed: partition sizes are estimated from a random sample
+of the candidates, so that the agent plays 8x10 boards at interactive speed.
+'''
+
+# Below this many (guess, candidate) pairs a process pool costs more than it saves.
+MIN_PARALLEL_PAIRS = 1 << 22
+# Below this many (guess, candidate) pairs scoring every guess is cheaper than finding equivalent ones.
+MIN_SYMMETRY_PAIRS = 1 << 19
+# Candidates and guesses drawn by the sampled strategy when too many codes remain to be scored exactly.
+SAMPLE_SIZE = 1 << 10
+SAMPLE_GUESSES = 1 << 9
+
+_shared_tables = {}
+_attached_tables = {}
+
+
+def _share_table(space: CodeSpace) -> Optional[Tuple[str, tuple]]:
+    """Copy the score table of a space into shared memory, once per process.
+
+    Tables memory-mapped from the persistent cache are not copied: workers map the same file.
+    """
+    if space.table is None or isinstance(space.table, np.memmap):
+        return None
+    key = space.key
+    if key not in _shared_tables:
+        # imported on first use only, to keep process pools off the cold start of the dashboard
+        from multiprocessing.shared_memory import SharedMemory
+        shm = SharedMemory(create=True, size=space.table.nbytes)
+        np.ndarray(space.table.shape, dtype=space.table.dtype, buffer=shm.buf)[...] = space.table
+        atexit.register(shm.unlink)
+        atexit.register(shm.close)
+        _shared_tables[key] = shm
+    return _shared_tables[key].name, space.table.shape
+
+
+def _worker_space(N_SLOTS: int, N_COLORS: int, rules: Variant, shared: Optional[Tuple[str, tuple]]) -> CodeSpace:
+    """Code space of a worker process, backed by the shared score table when there is one."""
+    space = code_space(N_SLOTS, N_COLORS, rules)
+    if shared is not None and space._table is None:
+        name, shape = shared
+        from multiprocessing.shared_memory import SharedMemory
+        # pool workers share the parent's resource tracker, which keeps ownership of the segment
+        shm = SharedMemory(name=name)
+        _attached_tables[name] = shm
+        space._table = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    return space
+
+
+def _shard_scores(
+    N_SLOTS: int,
+    N_COLORS: int,
+    rules: Variant,
+    shared: Optional[Tuple[str, tuple]],
+    guesses: np.ndarray,
+    candidates: np.ndarray,
+    score: Callable[[np.ndarray], np.ndarray]
+    ) -> np.ndarray:
+    """Score a shard of candidate guesses inside a worker process."""
+    space = _worker_space(N_SLOTS, N_COLORS, rules, shared)
+    return score(space.partition_counts(guesses, candidates))
+
+
+@lru_cache(maxsize=None)
+def _pool(workers: int) -> 'ProcessPoolExecutor':
+    """Process pool shared by every game of the process."""
+    from concurrent.futures import ProcessPoolExecutor
+    return ProcessPoolExecutor(max_workers=workers)
+
+
+def guess_scores(
+    space: CodeSpace,
+    guesses: np.ndarray,
+    candidates: np.ndarray,
+    score: Callable[[np.ndarray], np.ndarray],
+    workers: Optional[int] = None
+    ) -> np.ndarray:
+    """Score every guess, optionally sharding the guesses across a process pool.
+
+    Shards are contiguous slices of `guesses` and results are concatenated in order,
+    so the outcome does not depend on the number of workers.
+
+    Args:
+        space (CodeSpace): code space of the game
+        guesses (np.ndarray): indices of the guesses to be evaluated
+        candidates (np.ndarray): indices of the codes still consistent with the game
+        score (Callable[[np.ndarray], np.ndarray]): maps partition counts to one score per guess, must be picklable
+        workers (Optional[int], optional): number of worker processes, None or 1 to stay in process. Defaults to None.
+
+    Returns:
+        np.ndarray: one score per guess
+    """
+    if len(candidates) == space.n_codes and space.openings is not None:
+        # opening guesses, possibly reduced to their representatives
+        return score(space.openings[guesses])
+    if not workers or workers <= 1 or len(guesses)*len(candidates) < MIN_PARALLEL_PAIRS:
+        return score(space.partition_counts(guesses, candidates))
+    shared = _share_table(space)
+    shards = np.array_split(guesses, min(workers, len(guesses)))
+    futures = [
+        _pool(workers).submit(_shard_scores, space.N_SLOTS, space.N_COLORS, space.rules, shared, shard, candidates, score)
+        for shard in shards
+        ]
+    return np.concatenate([future.result() for future in futures])
+
+
+def best_guess(
+    space: CodeSpace,
+    candidates: Sequence[int],
+    score: Callable[[np.ndarray], np.ndarray],
+    workers: Optional[int] = None,
+    history: Optional[Sequence[int]] = None
+    ) -> int:
+    """Pick the guess minimizing the given partition score.
+
+    Every code is evaluated while the score table fits in memory, otherwise only candidates are;
+    given the history, only one guess per class of equivalent guesses is (see `symmetry`).
+    Ties are broken in favour of consistent guesses (which may win right away), then of the lowest index.
+
+    Args:
+        space (CodeSpace): code space of the game
+        candidates (Sequence[int]): indices of the codes still consistent with the game
+        score (Callable[[np.ndarray], np.ndarray]): maps partition counts to one score per guess, lower is better
+        workers (Optional[int], optional): number of worker processes scoring the guesses. Defaults to None.
+        history (Optional[Sequence[int]], optional): indices of the guesses scored so far, None to skip symmetry reduction. Defaults to None.
+
+    Returns:
+        int: index of the chosen guess
+    """
+    if len(candidates) <= 2:
+        return int(candidates[0])
+    candidates = np.asarray(candidates)
+    guesses = np.arange(space.n_codes) if space.table is not None else candidates
+    if history is not None and len(guesses)*len(candidates) >= MIN_SYMMETRY_PAIRS:
+        guesses = representatives(space, guesses, history)
+    scores = guess_scores(space, guesses, candidates, score, workers)
+    inconsistent = ~np.isin(guesses, candidates)
+    return int(guesses[np.lexsort((guesses, inconsistent, scores))[0]])
+
+
+def minimax_score(counts: np.ndarray) -> np.ndarray:
+    """Knuth's worst case: size of the largest partition."""
+    return counts.max(axis=1)
+
+
+def max_parts_score(counts: np.ndarray) -> np.ndarray:
+    """Number of non-empty partitions, negated so that lower is better."""
+    return -np.count_nonzero(counts, axis=1)
+
+
+def expected_size_score(counts: np.ndarray) -> np.ndarray:
+    """Expected size of the remaining candidate set (up to the constant 1/n factor)."""
+    return (counts**2).sum(axis=1)
+
+
+def random_guess(
+    space: CodeSpace,
+    candidates: Sequence[int],
+    rng: random.Random,
+    history: Optional[Sequence[int]] = None
+    ) -> int:
+    """Pick a consistent code uniformly at random, in O(1)."""
+    return int(candidates[rng.randrange(len(candidates))])
+
+
+def minimax(
+    space: CodeSpace,
+    candidates: Sequence[int],
+    rng: random.Random,
+    history: Optional[Sequence[int]] = None,
+    workers: Optional[int] = None
+    ) -> int:
+    """Knuth's minimax strategy."""
+    return best_guess(space, candidates, minimax_score, workers, history)
+
+
+def max_parts(
+    space: CodeSpace,
+    candidates: Sequence[int],
+    rng: random.Random,
+    history: Optional[Sequence[int]] = None,
+    workers: Optional[int] = None
+    ) -> int:
+    """Most-parts strategy."""
+    return best_guess(space, candidates, max_parts_score, workers, history)
+
+
+def expected_size(
+    space: CodeSpace,
+    candidates: Sequence[int],
+    rng: random.Random,
+    history: Optional[Sequence[int]] = None,
+    workers: Optional[int] = None
+    ) -> int:
+    """Expected-size strategy."""
+    return best_guess(space, candidates, expected_size_score, workers, history)
+
+
+class AnytimeReport(NamedTuple):
+    """Best guess found so far by `refine`, and how much of the guess pool it took into account."""
+    guess: int
+    score: Optional[float]
+    evaluated: int
+    total: int
+    seconds: float
+
+    @property
+    def coverage(self) -> float:
+        """Fraction of the guess pool evaluated."""
+        return self.evaluated/self.total if self.total else 1.0
+
+
+def _take(candidates: Sequence[int], positions: np.ndarray) -> np.ndarray:
+    """Candidate indices at the given positions, without materializing a `range`."""
+    if isinstance(candidates, range):
+        return candidates.start + positions
+    return np.asarray(candidates)[positions]
+
+
+def refine(
+    space: CodeSpace,
+    candidates: Sequence[int],
+    score: Callable[[np.ndarray], np.ndarray],
+    rng: random.Random,
+    history: Optional[Sequence[int]] = None,
+    deadline: Optional[float] = None,
+    chunk: int = CHUNK_CODES
+    ) -> Iterator[AnytimeReport]:
+    """Evaluate the guesses of `best_guess` progressively, yielding the best one after each block.
+
+    The first report is a random consistent code, yielded before any evaluation; then consistent codes
+    are scored in a random order, followed by the other codes when the score table fits in memory.
+    Scoring is split in units of about `chunk` (guess, candidate) pairs, and stops at the first unit
+    boundary past the deadline: the last report is then the best fully evaluated guess.
+    Once the pool is exhausted the guess is the one `best_guess` would pick.
+
+    Args:
+        space (CodeSpace): code space of the game
+        candidates (Sequence[int]): indices of the codes still consistent with the game
+        score (Callable[[np.ndarray], np.ndarray]): maps partition counts to one score per guess, lower is better
+        rng (random.Random): random generator ordering the guesses
+        history (Optional[Sequence[int]], optional): indices of the guesses scored so far, None to skip symmetry reduction. Defaults to None.
+        deadline (Optional[float], optional): `time.perf_counter()` value to stop at, unbounded by default. Defaults to None.
+        chunk (int, optional): number of pairs scored between two deadline checks. Defaults to CHUNK_CODES.
+
+    Yields:
+        Iterator[AnytimeReport]: reports whose guesses never get worse
+    """
+    start = time.perf_counter()
+    n = len(candidates)
+    if n <= 2:
+        yield AnytimeReport(int(candidates[0]), None, 0, 0, time.perf_counter() - start)
+        return
+
+    # consistent guesses follow the random permutation k -> a*k + b (mod n), which starts at the cheap guess
+    b = rng.randrange(n)
+    a = rng.randrange(1, n)
+    while gcd(a, n) != 1:
+        a = rng.randrange(1, n)
+    others = np.empty(0, dtype=np.int64)
+    if history is not None and not len(history) and n == space.n_codes:
+        opening = opening_representatives(space)
+        n, a, b = len(opening), 1, 0
+        candidates_pool = opening[rng.sample(range(n), n)]
+    elif space.table is not None:
+        candidates_pool = np.asarray(candidates)
+        pool = np.arange(space.n_codes)
+        if history is not None:
+            pool = representatives(space, pool, history)
+        consistent = np.isin(pool, candidates_pool)
+        others = pool[~consistent]
+        if len(pool) < space.n_codes:
+            # one consistent guess per class, keeping the cheap guess first
+            kept = pool[consistent]
+            first = _take(candidates, np.array([b]))
+            candidates_pool = np.concatenate([first, kept[kept != first[0]]])
+            n, a, b = len(candidates_pool), 1, 0
+    else:
+        candidates_pool = candidates
+    total = n + len(others)
+
+    best = (None, True, int(_take(candidates_pool, np.array([b]))[0]))
+    yield AnytimeReport(best[2], None, 0, total, time.perf_counter() - start)
+
+    n_candidates = len(candidates)
+    rows = max(1, chunk // n_candidates)
+    columns = min(n_candidates, chunk)
+    for offset in range(0, total, rows):
+        positions = np.arange(offset, min(offset + rows, total), dtype=np.int64)
+        inside = positions < n
+        guesses = np.concatenate([
+            _take(candidates_pool, (a*positions[inside] + b) % n),
+            others[positions[~inside] - n],
+            ])
+        counts = np.zeros((len(guesses), space.n_hints), dtype=np.int64)
+        for column in range(0, n_candidates, columns):
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            counts += space.partition_counts(guesses, _take(candidates, np.arange(column, min(column + columns, n_candidates))))
+        scores = score(counts)
+        k = np.lexsort((guesses, ~inside, scores))[0]
+        block_best = (scores[k].item(), bool(not inside[k]), int(guesses[k]))
+        if best[0] is None or block_best < best:
+            best = block_best
+        yield AnytimeReport(best[2], best[0], offset + len(guesses), total, time.perf_counter() - start)
+
+
+class Anytime:
+
+    def __init__(self, budget: float = 1.0, score: Callable[[np.ndarray], np.ndarray] = minimax_score) -> None:
+        """Initialize class.
+
+        Args:
+            budget (float, optional): time allowed per guess, in seconds. Defaults to 1.0.
+            score (Callable[[np.ndarray], np.ndarray], optional): maps partition counts to one score per guess, lower is better. Defaults to minimax_score.
+        """
+        self.budget = budget
+        self.score = score
+        self.report = None
+
+    def __call__(
+        self,
+        space: CodeSpace,
+        candidates: Sequence[int],
+        rng: random.Random,
+        history: Optional[Sequence[int]] = None
+        ) -> int:
+        """Best guess found within the budget, see `refine`; the outcome is kept in `report`."""
+        deadline = time.perf_counter() + self.budget
+        for self.report in refine(space, candidates, self.score, rng, history, deadline):
+            pass
+        return self.report.guess
+
+
+
+class PartitionEstimate(NamedTuple):
+    """Hint-partition sizes estimated from a sample of the candidates, with their confidence bounds."""
+    counts: np.ndarray
+    lower: np.ndarray
+    upper: np.ndarray
+    sample_size: int
+
+
+def estimate_partition_counts(
+    space: CodeSpace,
+    guesses: np.ndarray,
+    candidates: Sequence[int],
+    rng: random.Random,
+    sample_size: int = SAMPLE_SIZE,
+    confidence: Optional[float] = 0.95
+    ) -> PartitionEstimate:
+    """Estimate the hint-partition histogram of every guess from a uniform sample of the candidates.
+
+    Each partition size is the candidate count times the fraction of the sample falling in it, bounded
+    by a Wilson score interval (which stays meaningful for empty or full partitions of the sample),
+    corrected for sampling without replacement. Candidate sets no larger than the sample are counted exactly.
+
+    Args:
+        space (CodeSpace): code space of the game
+        guesses (np.ndarray): indices of the guesses to be evaluated
+        candidates (Sequence[int]): indices of the codes still consistent with the game
+        rng (random.Random): random generator drawing the sample
+        sample_size (int, optional): number of candidates drawn. Defaults to SAMPLE_SIZE.
+        confidence (Optional[float], optional): confidence level of the bounds, None to collapse them on the estimate. Defaults to 0.95.
+
+    Returns:
+        PartitionEstimate: (len(guesses), n_hints) estimated sizes and bounds
+    """
+    n = len(candidates)
+    if n <= sample_size:
+        counts = space.partition_counts(guesses, np.asarray(candidates)).astype(np.float64)
+        return PartitionEstimate(counts, counts, counts, n)
+    sample = _take(candidates, np.sort(np.array(rng.sample(range(n), sample_size), dtype=np.int64)))
+    p = space.partition_counts(guesses, sample)/sample_size
+    if confidence is None:
+        return PartitionEstimate(n*p, n*p, n*p, sample_size)
+    z2 = NormalDist().inv_cdf(0.5 + confidence/2)**2
+    # effective sample size of the finite population correction
+    m = sample_size*(n - 1)/(n - sample_size)
+    center = (p + z2/(2*m))/(1 + z2/m)
+    margin = np.sqrt(z2*p*(1 - p)/m + z2**2/(4*m**2))/(1 + z2/m)
+    return PartitionEstimate(n*p, n*np.clip(center - margin, 0, 1), n*np.clip(center + margin, 0, 1), sample_size)
+
+
+def sampled(
+    space: CodeSpace,
+    candidates: Sequence[int],
+    rng: random.Random,
+    history: Optional[Sequence[int]] = None,
+    workers: Optional[int] = None,
+    score: Callable[[np.ndarray], np.ndarray] = minimax_score,
+    sample_size: int = SAMPLE_SIZE,
+    n_guesses: int = SAMPLE_GUESSES,
+    confidence: Optional[float] = 0.95
+    ) -> int:
+    """Partition strategy on estimated partition sizes, exact once few enough candidates remain.
+
+    Guesses are drawn like in `best_guess`, except that without a score table only `n_guesses`
+    random candidates are evaluated (or one code per opening class, on the first turn).
+    They are ranked by the worse of the scores of the lower and upper bounds of their partitions, so that
+    a guess whose estimate is uncertain is not preferred by chance; pass `confidence=None` to rank the plain estimates.
+
+    Args:
+        space (CodeSpace): code space of the game
+        candidates (Sequence[int]): indices of the codes still consistent with the game
+        rng (random.Random): random generator drawing the samples
+        history (Optional[Sequence[int]], optional): indices of the guesses scored so far, None to skip symmetry reduction. Defaults to None.
+        workers (Optional[int], optional): number of worker processes, used when candidates are scored exactly. Defaults to None.
+        score (Callable[[np.ndarray], np.ndarray], optional): maps partition counts to one score per guess, lower is better. Defaults to minimax_score.
+        sample_size (int, optional): number of candidates each guess is scored against. Defaults to SAMPLE_SIZE.
+        n_guesses (int, optional): number of guesses evaluated without a score table. Defaults to SAMPLE_GUESSES.
+        confidence (Optional[float], optional): confidence level of the bounds, None to rank estimates. Defaults to 0.95.
+
+    Returns:
+        int: index of the chosen guess
+    """
+    n = len(candidates)
+    if n <= sample_size:
+        return best_guess(space, candidates, score, workers, history)
+    if history is not None and not len(history) and n == space.n_codes:
+        guesses = opening_representatives(space)
+    elif space.table is not None:
+        guesses = np.arange(space.n_codes)
+        if history is not None:
+            guesses = representatives(space, guesses, history)
+    else:
+        guesses = _take(candidates, np.sort(np.array(rng.sample(range(n), min(n, n_guesses)), dtype=np.int64)))
+    estimate = estimate_partition_counts(space, guesses, candidates, rng, sample_size, confidence)
+    scores = np.maximum(score(estimate.lower), score(estimate.upper))
+    inconsistent = ~np.isin(guesses, candidates) if space.table is not None else np.zeros(len(guesses), dtype=bool)
+    return int(guesses[np.lexsort((guesses, inconsistent, scores))[0]])
+
+
+STRATEGIES = {
+    'random': random_guess,
+    'minimax': minimax,
+    'max_parts': max_parts,
+    'expected_size': expected_size,
+    'sampled': sampled,
+    }
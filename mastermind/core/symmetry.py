@@ -0,0 +1,109 @@
+from typing import Sequence
+
+import numpy as np
+
+from mastermind.core.scoring import CodeSpace
+
+'''
+Symmetry reduction of candidate guesses.
+
+Permuting positions or colors of every code leaves hints unchanged, so a permutation which fixes each
+guess played so far also maps the set of consistent codes onto itself, and any two guesses it relates
+partition that set alike. This module tracks the subgroup the history has not broken yet:
+    - positions whose columns are identical across all played guesses can be freely permuted
+      among themselves;
+    - colors which have never been played can be freely permuted among themselves.
+Two codes lie in the same orbit iff, for each block of interchangeable positions, they hold the same
+multiset of played colors, and the multiset over unplayed colors of per-block occurrence vectors matches.
+'''
+
+
+def position_blocks(space: CodeSpace, history: Sequence[int]) -> list:
+    """Group positions holding the same color in every played guess.
+
+    Args:
+        space (CodeSpace): code space of the game
+        history (Sequence[int]): indices of the guesses played so far
+
+    Returns:
+        list: blocks of interchangeable positions
+    """
+    columns = space.digits(np.asarray(history, dtype=np.int64)) if len(history) else np.zeros((space.N_SLOTS, 0))
+    blocks = {}
+    for slot, column in enumerate(columns):
+        blocks.setdefault(column.tobytes(), []).append(slot)
+    return list(blocks.values())
+
+
+def is_trivial(space: CodeSpace, history: Sequence[int]) -> bool:
+    """Whether the history broke every symmetry, leaving nothing to reduce."""
+    played = np.unique(space.digits(np.asarray(history, dtype=np.int64))) if len(history) else ()
+    return space.N_COLORS - len(played) <= 1 and len(position_blocks(space, history)) == space.N_SLOTS
+
+
+def representatives(space: CodeSpace, pool: np.ndarray, history: Sequence[int]) -> np.ndarray:
+    """Keep one guess (the lowest index) per orbit of the symmetry group left unbroken by the history.
+
+    The pool must itself be invariant under that group, e.g. the whole space or the consistent codes.
+
+    Args:
+        space (CodeSpace): code space of the game
+        pool (np.ndarray): sorted indices of the candidate guesses
+        history (Sequence[int]): indices of the guesses played so far
+
+    Returns:
+        np.ndarray: sorted indices of the representatives
+    """
+    if is_trivial(space, history):
+        return pool
+    if not len(history) and len(pool) == space.n_codes:
+        return opening_representatives(space)
+    played = set(np.unique(space.digits(np.asarray(history, dtype=np.int64))).tolist()) if len(history) else set()
+    blocks = position_blocks(space, history)
+    digits = space.digits(pool)
+    radix = (space.N_SLOTS + 1)**np.arange(len(blocks), dtype=np.int64)
+    fixed_keys, free_keys = [], []
+    for color in range(space.N_COLORS):
+        # occurrences of the color within every block
+        counts = np.zeros((len(blocks), len(pool)), dtype=np.uint8)
+        for b, block in enumerate(blocks):
+            for slot in block:
+                counts[b] += digits[slot] == color
+        if color in played:
+            fixed_keys.extend(counts)
+        else:
+            free_keys.append(radix @ counts)
+    if free_keys:
+        fixed_keys.extend(np.sort(np.stack(free_keys), axis=0))
+    _, first = np.unique(np.stack(fixed_keys).T, axis=0, return_index=True)
+    return pool[np.sort(first)]
+
+
+def opening_representatives(space: CodeSpace) -> np.ndarray:
+    """Representatives of the opening guesses, one per partition of N_SLOTS into at most N_COLORS parts.
+
+    Without history the orbit of a code is its color multiplicity pattern, whose lowest index is
+    the code holding color 0 m1 times, then color 1 m2 times and so on, with m1 >= m2 >= ...
+    Patterns repeating a color are skipped in spaces whose codes never do.
+
+    Args:
+        space (CodeSpace): code space of the game
+
+    Returns:
+        np.ndarray: sorted indices of the representatives
+    """
+    def partitions(n: int, largest: int, parts: int):
+        if n == 0:
+            yield ()
+            return
+        if parts == 0:
+            return
+        for m in range(min(n, largest), 0, -1):
+            for rest in partitions(n - m, m, parts - 1):
+                yield (m,) + rest
+
+    codes = [
+        sum(((color,)*m for color, m in enumerate(pattern)), ())
+        for pattern in partitions(space.N_SLOTS, space.N_SLOTS if space.repeats else 1, space.N_COLORS)
+        ]
+    return np.sort(space.index_many(codes))
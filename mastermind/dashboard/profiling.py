@@ -0,0 +1,52 @@
+import os
+import time
+import logging
+import importlib
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Iterator
+
+'''
+Startup profiling of the dashboard.
+
+Imports and first-use work of the app are timed once per process, and the time to first render
+(from the first import of this module, i.e. the start of the first script run, to the end of it) is logged.
+Set MASTERMIND_PROFILE_STARTUP=1 to also display the timings in the app.
+'''
+
+START = time.perf_counter()
+logger = logging.getLogger(__name__)
+
+# seconds spent in each step, the first time it ran in the process
+timings = {}
+
+
+@contextmanager
+def timed(name: str) -> Iterator[None]:
+    """Time a step of the startup, only its first run is recorded."""
+    start = time.perf_counter()
+    yield
+    timings.setdefault(name, time.perf_counter() - start)
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Import a module on first use, timing the import."""
+    with timed(f'import {name}'):
+        return importlib.import_module(name)
+
+
+def first_render() -> None:
+    """Record and log the time to first render, once per process."""
+    if 'first render' not in timings:
+        timings['first render'] = time.perf_counter() - START
+        logger.info('startup timings: %s', report())
+
+
+def enabled() -> bool:
+    """Whether the timings are displayed in the app."""
+    return os.environ.get('MASTERMIND_PROFILE_STARTUP', '') not in ('', '0')
+
+
+def report() -> str:
+    """Startup timings, in milliseconds."""
+    return ', '.join(f'{name}: {1e3*seconds:.1f} ms' for name, seconds in timings.items())
@@ -17,7 +17,9 @@ class _SessionState:
         """Initialize SessionState instance."""
         self.__dict__["_state"] = {
             "data": {},
-            "hash": None,
+            "version": 0,
+            "synced_version": None,
+            "deep": {},
             "hasher": _CodeHasher(hash_funcs),
             "is_rerun": False,
             "session": session,
@@ -27,7 +29,7 @@ class _SessionState:
         """Initialize state data once."""
         for item, value in kwargs.items():
             if item not in self._state["data"]:
-                self._state["data"][item] = value
+                self._set(item, value)
 
     def __getitem__(self, item):
         """Return a saved state value, None if item is undefined."""
@@ -39,37 +41,80 @@ class _SessionState:
 
     def __setitem__(self, item, value):
         """Set state value."""
-        self._state["data"][item] = value
+        self._set(item, value)
 
     def __setattr__(self, item, value):
         """Set state value."""
-        self._state["data"][item] = value
+        self._set(item, value)
+
+    def _set(self, item, value):
+        """Set state value, bumping the version only if it actually changed."""
+        data = self._state["data"]
+        if item in data:
+            previous = data[item]
+            try:
+                unchanged = previous is value or bool(previous == value)
+            except (TypeError, ValueError):
+                # e.g. arrays, whose comparison is elementwise
+                unchanged = False
+            if unchanged:
+                return
+        data[item] = value
+        self._state["version"] += 1
+
+    def track(self, *items):
+        """Opt mutable values in to a deep check at every sync.
+
+        Assignments are tracked for every value, but in place mutations (e.g. `state.items.append(x)`)
+        are only noticed for tracked items, whose values are hashed at each sync.
+        """
+        for item in items:
+            self._state["deep"].setdefault(item, None)
 
     def clear(self):
         """Clear session state and request a rerun."""
         self._state["data"].clear()
+        self._state["version"] += 1
         self._state["session"].request_rerun()
 
+    def _deep_changed(self):
+        """Hash tracked values, returning whether any of them changed since the last sync."""
+        changed = False
+        for item, digest in self._state["deep"].items():
+            current = self._state["hasher"].to_bytes(self._state["data"].get(item), None)
+            changed |= digest is not None and digest != current
+            self._state["deep"][item] = current
+        return changed
+
     def sync(self):
-        """Rerun the app with all state values up to date from the beginning to fix rollbacks."""
+        """Rerun the app with all state values up to date from the beginning to fix rollbacks.
+
+        Changes are detected through the version counter bumped by assignments, plus the hashes of tracked
+        values only, so a sync costs O(tracked items) instead of hashing the whole state.
+        """
 
         # Ensure to rerun only once to avoid infinite loops
         # caused by a constantly changing state value at each run.
         #
         # Example: state.value += 1
+        deep_changed = self._deep_changed()
         if self._state["is_rerun"]:
             self._state["is_rerun"] = False
 
-        elif self._state["hash"] is not None:
-            if self._state["hash"] != self._state["hasher"].to_bytes(self._state["data"], None):
+        elif self._state["synced_version"] is not None:
+            if self._state["synced_version"] != self._state["version"] or deep_changed:
                 self._state["is_rerun"] = True
                 self._state["session"].request_rerun()
 
-        self._state["hash"] = self._state["hasher"].to_bytes(self._state["data"], None)
+        self._state["synced_version"] = self._state["version"]
+
+
+def _get_session_id():
+    return get_report_ctx().session_id
 
 
 def _get_session():
-    session_id = get_report_ctx().session_id
+    session_id = _get_session_id()
     session_info = Server.get_current()._get_session_info(session_id)
 
     if session_info is None:
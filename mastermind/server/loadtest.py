@@ -0,0 +1,223 @@
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import subprocess
+from typing import Dict, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from mastermind.core.mastermind import MasterMind
+from mastermind.core.scoring import VARIANTS
+
+'''
+Local load generator for the game server: many clients play whole games concurrently, each over
+its own keep-alive connection, and request latencies are reported per endpoint.
+
+Usage:
+    python -m mastermind.server.loadtest --serve --concurrency 64 --duration 10
+    python -m mastermind.server.loadtest --port 8000 --role code_breaker
+'''
+
+
+class LoadReport(NamedTuple):
+    """Outcome of a load test."""
+
+    latencies: Dict[str, list]
+    seconds: float
+    errors: int
+    games: int
+
+    @property
+    def requests(self) -> int:
+        return sum(len(values) for values in self.latencies.values())
+
+    @property
+    def requests_per_second(self) -> float:
+        return self.requests/self.seconds if self.seconds else float('inf')
+
+    def summary(self) -> str:
+        """Human readable summary of the report, latencies in milliseconds."""
+        lines = [
+            f'requests: {self.requests} ({self.errors} errors), games: {self.games}',
+            f'requests/s: {self.requests_per_second:.1f}',
+            f"{'endpoint':<12}{'count':>8}{'p50':>10}{'p99':>10}",
+            ]
+        every = [value for values in self.latencies.values() for value in values]
+        for name, values in sorted(self.latencies.items()) + [('all', every)]:
+            if values:
+                p50, p99 = np.percentile(values, [50, 99])*1e3
+                lines.append(f'{name:<12}{len(values):>8}{p50:>10.2f}{p99:>10.2f}')
+        return '\n'.join(lines)
+
+
+class _Connection:
+
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def request(self, method: str, path: str, body: Optional[dict] = None) -> Tuple[int, dict]:
+        """Send a request over the kept-alive connection, reconnecting if the server closed it."""
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        payload = json.dumps(body).encode() if body is not None else b''
+        self.writer.write(
+            f'{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n'
+            f'Content-Type: application/json\r\nContent-Length: {len(payload)}\r\n\r\n'.encode() + payload
+            )
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        response = json.loads(await self.reader.readexactly(int(headers.get('content-length', 0))))
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, response
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.reader = self.writer = None
+
+
+async def _client(
+    host: str,
+    port: int,
+    deadline: float,
+    N_SLOTS: int,
+    N_COLORS: int,
+    variant: str,
+    role: str,
+    max_turns: int,
+    rng: random.Random,
+    latencies: Dict[str, list],
+    counters: Dict[str, int]
+    ) -> None:
+    """Play games one after the other until the deadline."""
+    connection = _Connection(host, port)
+    judge = MasterMind(N_SLOTS, N_COLORS, rng=rng, variant=variant)
+
+    async def call(name: str, method: str, path: str, body: Optional[dict] = None) -> Optional[dict]:
+        start = time.perf_counter()
+        status, response = await connection.request(method, path, body)
+        latencies.setdefault(name, []).append(time.perf_counter() - start)
+        if status >= 400:
+            counters['errors'] += 1
+            return None
+        return response
+
+    try:
+        while time.perf_counter() < deadline:
+            game = await call('new_game', 'POST', '/games', dict(slots=N_SLOTS, colors=N_COLORS, variant=variant))
+            if game is None:
+                continue
+            path = f"/games/{game['id']}"
+            secret = judge.omega[rng.randrange(len(judge.omega))]
+            for _ in range(max_turns):
+                if role == 'code_breaker':
+                    code = judge.omega[rng.randrange(len(judge.omega))]
+                    response = await call('guess', 'POST', f'{path}/guess', dict(code=list(code)))
+                    if response is None or response['solved']:
+                        break
+                else:
+                    response = await call('move', 'POST', f'{path}/move')
+                    if response is None:
+                        break
+                    hint = judge.get_hint(tuple(response['code']), secret)
+                    response = await call('hint', 'POST', f'{path}/hint', dict(hint=list(hint)))
+                    if response is None or response['solved']:
+                        break
+            await call('delete', 'DELETE', path)
+            counters['games'] += 1
+    finally:
+        connection.close()
+
+
+async def load(
+    host: str = '127.0.0.1',
+    port: int = 8000,
+    concurrency: int = 16,
+    duration: float = 10.0,
+    N_SLOTS: int = 4,
+    N_COLORS: int = 6,
+    role: str = 'code_maker',
+    max_turns: int = 10,
+    seed: Optional[int] = 0,
+    variant: str = 'classic'
+    ) -> LoadReport:
+    """Hit a running game server with concurrent clients.
+
+    Args:
+        host (str, optional): server address. Defaults to '127.0.0.1'.
+        port (int, optional): server port. Defaults to 8000.
+        concurrency (int, optional): number of concurrent clients. Defaults to 16.
+        duration (float, optional): seconds after which clients stop starting new games. Defaults to 10.0.
+        N_SLOTS (int, optional): length of code. Defaults to 4.
+        N_COLORS (int, optional): number of distinct available colors. Defaults to 6.
+        role (str, optional): role played by clients, 'code_maker' (agent moves) or 'code_breaker' (random guesses). Defaults to 'code_maker'.
+        max_turns (int, optional): turns after which a game is abandoned. Defaults to 10.
+        seed (Optional[int], optional): seed of the clients' random generators. Defaults to 0.
+        variant (str, optional): game variant, a name in `VARIANTS`. Defaults to 'classic'.
+
+    Returns:
+        LoadReport: latencies of every request, by endpoint
+    """
+    latencies, counters = {}, dict(errors=0, games=0)
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, start + duration, N_SLOTS, N_COLORS, variant, role, max_turns, random.Random(rng.getrandbits(64)), latencies, counters)
+        for _ in range(concurrency)
+        ))
+    return LoadReport(latencies, time.perf_counter() - start, counters['errors'], counters['games'])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Load test the MasterMind game server.')
+    parser.add_argument('--host', default='127.0.0.1', help='server address')
+    parser.add_argument('--port', type=int, default=8000, help='server port')
+    parser.add_argument('--serve', action='store_true', help='start a local server on a free port for the test')
+    parser.add_argument('--workers', type=int, default=None, help='threads of the local server')
+    parser.add_argument('--strategy', default='random', help='agent strategy of the local server')
+    parser.add_argument('--concurrency', type=int, default=16, help='number of concurrent clients')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds of load')
+    parser.add_argument('--slots', type=int, default=4, help='length of code')
+    parser.add_argument('--colors', type=int, default=6, help='number of distinct colors')
+    parser.add_argument('--variant', default='classic', choices=list(VARIANTS), help='game variant')
+    parser.add_argument('--role', default='code_maker', choices=['code_maker', 'code_breaker'], help='role played by clients')
+    parser.add_argument('--max-turns', type=int, default=10, help='turns after which a game is abandoned')
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    args = parser.parse_args()
+
+    server = None
+    port = args.port
+    if args.serve:
+        command = [sys.executable, '-m', 'mastermind.server.service', '--host', args.host, '--port', '0', '--strategy', args.strategy]
+        if args.workers:
+            command += ['--workers', str(args.workers)]
+        server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+        # the server prints its address once listening
+        port = int(server.stdout.readline().rsplit(':', 1)[1])
+    try:
+        report = asyncio.run(load(
+            args.host, port, args.concurrency, args.duration, args.slots, args.colors, args.role, args.max_turns, args.seed, args.variant
+            ))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    print(report.summary())
+
+
+if __name__ == '__main__':
+    main()
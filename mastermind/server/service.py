@@ -0,0 +1,313 @@
+import json
+import uuid
+import asyncio
+import argparse
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+
+from mastermind.core.mastermind import MAX_PARTITION_CODES, PENDING_HINT, MasterMind
+from mastermind.core.registry import GameRegistry, game_factory
+from mastermind.core.scoring import VARIANTS
+from mastermind.core.strategies import STRATEGIES
+
+'''
+Headless asyncio HTTP/JSON game server.
+
+Endpoints (bodies and responses are JSON objects):
+    POST   /games                 {"slots": 4, "colors": 6, "variant": "classic"} -> new game, whose "id" is used below
+    GET    /games/{id}            state of the game
+    DELETE /games/{id}            drop the game
+    POST   /games/{id}/guess      {"code": [...]} CodeBreaker: score a player guess against the secret
+    POST   /games/{id}/move       CodeMaker: the agent plays its next guess, with the codes each hint would leave (null on the largest boards)
+    POST   /games/{id}/hint       {"hint": [black, white]} CodeMaker: score the last agent guess, incoherent hints are rejected
+
+Game operations run on a thread pool, one at a time per game, so that solver work never blocks
+the event loop; games are held by a `GameRegistry`, which bounds their memory and expires idle ones.
+
+Usage:
+    python -m mastermind.server.service --port 8000 --workers 4
+'''
+
+MAX_BODY_BYTES = 1 << 16
+REASONS = {200: 'OK', 201: 'Created', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 409: 'Conflict', 413: 'Payload Too Large', 500: 'Internal Server Error'}
+
+
+class HTTPError(Exception):
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _code(game: MasterMind, value: object) -> tuple:
+    """Validate a code received from a client."""
+    if (
+        not isinstance(value, list) or len(value) != game.N_SLOTS
+        or not all(isinstance(c, int) and 0 <= c < game.N_COLORS for c in value)
+        ):
+        raise HTTPError(400, f'code must be a list of {game.N_SLOTS} integers in [0, {game.N_COLORS})')
+    if not game.space.repeats and len(set(value)) < game.N_SLOTS:
+        raise HTTPError(400, f'codes of the {game.variant} variant cannot repeat a color')
+    return tuple(value)
+
+
+def _hint(game: MasterMind, value: object) -> tuple:
+    """Validate a hint received from a client."""
+    if (
+        not isinstance(value, list) or len(value) != 2
+        or not all(isinstance(h, int) and h >= 0 for h in value) or sum(value) > game.N_SLOTS
+        or tuple(value) == (game.N_SLOTS - 1, 1) or (value[1] and not game.space.whites)
+        ):
+        raise HTTPError(400, 'hint must be a feasible [black, white] pair')
+    return tuple(value)
+
+
+def _state(game_id: str, game: MasterMind) -> dict:
+    return dict(
+        id=game_id,
+        slots=game.N_SLOTS,
+        colors=game.N_COLORS,
+        variant=game.variant,
+        turns=[
+            dict(code=list(game.omega[turn.code]), hint=None if turn.hint == PENDING_HINT else list(game.space.decode_hint(turn.hint)))
+            for turn in game.turns
+            ],
+        candidates=game.n_candidates,
+        win_odds=game.calculate_win_odds(),
+        solved=game.success,
+        )
+
+
+class GameService:
+
+    def __init__(self, registry: GameRegistry, workers: Optional[int] = None, max_slots: int = 8, max_colors: int = 10) -> None:
+        """Initialize class.
+
+        Args:
+            registry (GameRegistry): games of every client, game ids being the session ids
+            workers (Optional[int], optional): threads running game operations. Defaults to None, i.e. the `ThreadPoolExecutor` default.
+            max_slots (int, optional): longest code allowed. Defaults to 8.
+            max_colors (int, optional): most colors allowed. Defaults to 10.
+        """
+        self.registry = registry
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.max_slots = max_slots
+        self.max_colors = max_colors
+        # one lock per live game, gone with the game
+        self._locks = weakref.WeakKeyDictionary()
+
+    def _game(self, game_id: str) -> MasterMind:
+        """Game of the given id, the board configuration and variant being encoded in it."""
+        try:
+            _, board, variant = game_id.split('-')
+            N_SLOTS, N_COLORS = (int(x) for x in board.split('x'))
+        except ValueError:
+            raise HTTPError(404, f'unknown game {game_id}') from None
+        game = self.registry.get(game_id, N_SLOTS, N_COLORS, variant, create=False)
+        if game is None:
+            raise HTTPError(404, f'unknown game {game_id}')
+        return game
+
+    async def _run(self, game_id: str, game: MasterMind, operation: Callable[[], dict]) -> dict:
+        """Run an operation on a game in the thread pool, after the ones already queued for it."""
+        lock = self._locks.setdefault(game, asyncio.Lock())
+        async with lock:
+            result = await asyncio.get_running_loop().run_in_executor(self.executor, operation)
+        self.registry.touch(game_id, game.N_SLOTS, game.N_COLORS, game.variant)
+        return result
+
+    async def handle(self, method: str, path: str, body: dict) -> Tuple[int, dict]:
+        """Dispatch a request to its endpoint.
+
+        Args:
+            method (str): HTTP method
+            path (str): request path
+            body (dict): decoded JSON body, empty if none
+
+        Returns:
+            Tuple[int, dict]: HTTP status and response body
+        """
+        parts = [part for part in path.split('?', 1)[0].split('/') if part]
+        if parts == ['games']:
+            if method != 'POST':
+                raise HTTPError(405, 'use POST to start a game')
+            return 201, await self.new_game(body)
+        if len(parts) == 2 and parts[0] == 'games':
+            if method == 'GET':
+                game = self._game(parts[1])
+                return 200, await self._run(parts[1], game, partial(_state, parts[1], game))
+            if method == 'DELETE':
+                self._game(parts[1])
+                self.registry.reset(parts[1])
+                return 200, dict(id=parts[1], deleted=True)
+            raise HTTPError(405, 'use GET or DELETE on a game')
+        if len(parts) == 3 and parts[0] == 'games' and parts[2] in ('guess', 'move', 'hint'):
+            if method != 'POST':
+                raise HTTPError(405, f'use POST on {parts[2]}')
+            game = self._game(parts[1])
+            return 200, await getattr(self, parts[2])(parts[1], game, body)
+        raise HTTPError(404, f'no endpoint at {path}')
+
+    async def new_game(self, body: dict) -> dict:
+        N_SLOTS, N_COLORS, variant = body.get('slots', 4), body.get('colors', 6), body.get('variant', 'classic')
+        if not (isinstance(N_SLOTS, int) and 2 <= N_SLOTS <= self.max_slots):
+            raise HTTPError(400, f'slots must be an integer in [2, {self.max_slots}]')
+        if not (isinstance(N_COLORS, int) and 2 <= N_COLORS <= self.max_colors):
+            raise HTTPError(400, f'colors must be an integer in [2, {self.max_colors}]')
+        if variant not in VARIANTS:
+            raise HTTPError(400, f'variant must be one of {", ".join(VARIANTS)}')
+        if not VARIANTS[variant].repeats and N_COLORS < N_SLOTS:
+            raise HTTPError(400, f'the {variant} variant needs at least as many colors as slots')
+        game_id = f'{uuid.uuid4().hex}-{N_SLOTS}x{N_COLORS}-{variant}'
+        game = self.registry.get(game_id, N_SLOTS, N_COLORS, variant)
+        return await self._run(game_id, game, partial(_state, game_id, game))
+
+    async def guess(self, game_id: str, game: MasterMind, body: dict) -> dict:
+        code = _code(game, body.get('code'))
+
+        def operation() -> dict:
+            if game.success:
+                raise HTTPError(409, 'the game is over')
+            hint = game.get_hint(code)
+            game.user_guess(code)
+            game.apply_feedback(code, hint)
+            return dict(hint=list(hint), turn=game.trials, candidates=game.n_candidates, win_odds=game.calculate_win_odds(), solved=game.success)
+
+        return await self._run(game_id, game, operation)
+
+    async def move(self, game_id: str, game: MasterMind, body: dict) -> dict:
+
+        def operation() -> dict:
+            if game.success:
+                raise HTTPError(409, 'the game is over')
+            if game.turns and game.turns[-1].hint == PENDING_HINT:
+                raise HTTPError(409, 'the last agent guess has not been scored yet')
+            try:
+                game.agent_guess()
+            except IndexError:
+                raise HTTPError(409, 'hints are incoherent, no code is consistent with them') from None
+            hints = None
+            # counting every hint of a space too large to keep its hints would cost a pass of its own
+            if game.survivors is not None or game.space.n_codes <= MAX_PARTITION_CODES:
+                partition = game.hint_partition()
+                hints = [
+                    dict(hint=list(game.space.decode_hint(hint)), candidates=int(partition.counts[hint]))
+                    for hint in np.flatnonzero(partition.counts)
+                    ]
+            return dict(code=list(game.last_guess), turn=game.trials, candidates=game.n_candidates, win_odds=game.calculate_win_odds(), hints=hints)
+
+        return await self._run(game_id, game, operation)
+
+    async def hint(self, game_id: str, game: MasterMind, body: dict) -> dict:
+        hint = _hint(game, body.get('hint'))
+
+        def operation() -> dict:
+            if not game.turns or game.turns[-1].hint != PENDING_HINT:
+                raise HTTPError(409, 'no agent guess is waiting for a hint')
+            if not game.is_coherent(hint):
+                raise HTTPError(409, 'hint is incoherent, no code would get it')
+            if hint[0] == game.N_SLOTS:
+                game.turns[-1].hint = game.space.encode_hint(*hint)
+                game.success = True
+            else:
+                game.apply_feedback(game.last_guess, hint)
+            return dict(turn=game.trials, candidates=game.n_candidates, solved=game.success)
+
+        return await self._run(game_id, game, operation)
+
+
+async def _respond(writer: asyncio.StreamWriter, status: int, body: dict, keep_alive: bool) -> None:
+    payload = json.dumps(body).encode()
+    writer.write(
+        f'HTTP/1.1 {status} {REASONS.get(status, "")}\r\n'
+        f'Content-Type: application/json\r\n'
+        f'Content-Length: {len(payload)}\r\n'
+        f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode() + payload
+        )
+    await writer.drain()
+
+
+async def serve_connection(service: GameService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """Serve the HTTP/1.1 requests of one connection, kept alive until the client closes it."""
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            try:
+                method, path, version = request_line.decode('latin-1').split()
+            except ValueError:
+                await _respond(writer, 400, dict(error='malformed request line'), False)
+                break
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b'\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                headers[name.strip().lower()] = value.strip()
+            keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+            length = int(headers.get('content-length', 0) or 0)
+            if length > MAX_BODY_BYTES:
+                await _respond(writer, 413, dict(error='body too large'), False)
+                break
+            raw = await reader.readexactly(length) if length else b''
+            try:
+                body = json.loads(raw) if raw else {}
+                if not isinstance(body, dict):
+                    raise HTTPError(400, 'body must be a JSON object')
+                status, response = await service.handle(method, path, body)
+            except HTTPError as e:
+                status, response = e.status, dict(error=str(e))
+            except json.JSONDecodeError:
+                status, response = 400, dict(error='body is not valid JSON')
+            except Exception as e:
+                status, response = 500, dict(error=f'{type(e).__name__}: {e}')
+            await _respond(writer, status, response, keep_alive)
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(service: GameService, host: str = '127.0.0.1', port: int = 8000, ready: Optional[Callable[[int], None]] = None) -> None:
+    """Run the server until cancelled.
+
+    Args:
+        service (GameService): game endpoints
+        host (str, optional): interface to listen on. Defaults to '127.0.0.1'.
+        port (int, optional): port to listen on, 0 for any free one. Defaults to 8000.
+        ready (Optional[Callable[[int], None]], optional): called with the actual port once listening. Defaults to None.
+    """
+    server = await asyncio.start_server(partial(serve_connection, service), host, port)
+    if ready is not None:
+        ready(server.sockets[0].getsockname()[1])
+    async with server:
+        await server.serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Serve MasterMind games over HTTP/JSON.')
+    parser.add_argument('--host', default='127.0.0.1', help='interface to listen on')
+    parser.add_argument('--port', type=int, default=8000, help='port to listen on, 0 for any free one')
+    parser.add_argument('--workers', type=int, default=None, help='threads running game operations')
+    parser.add_argument('--strategy', default='random', choices=sorted(STRATEGIES), help='agent guess strategy, following its opening books when built')
+    parser.add_argument('--max-slots', type=int, default=8, help='longest code allowed')
+    parser.add_argument('--max-colors', type=int, default=10, help='most colors allowed')
+    args = parser.parse_args()
+    registry = GameRegistry(factory=game_factory(args.strategy))
+    service = GameService(registry, args.workers, args.max_slots, args.max_colors)
+    try:
+        asyncio.run(serve(service, args.host, args.port, lambda port: print(f'listening on http://{args.host}:{port}', flush=True)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def no_disk_cache(monkeypatch):
+    """Keep tests off the persistent table cache of the machine."""
+    monkeypatch.setenv('MASTERMIND_CACHE_DIR', '')
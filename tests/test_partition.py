@@ -0,0 +1,92 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from mastermind.core import mastermind
+from mastermind.core.mastermind import MasterMind
+from test_scoring import reference_hint
+
+
+def reference_counts(game: MasterMind) -> Counter:
+    """Candidates left by each encoded hint of the pending guess, from the scored turns only."""
+    codes = [game.space.decode(k) for k in range(game.space.n_codes)]
+    hint = lambda guess, code: game.space.encode_hint(*reference_hint(codes[guess], codes[code], game.space.whites))
+    scored = [turn for turn in game.turns if turn.hint != mastermind.PENDING_HINT]
+    played = {turn.code for turn in game.turns}
+    consistent = [k for k in range(len(codes)) if all(hint(turn.code, k) == turn.hint for turn in scored)]
+    guess = game.turns[-1].code
+    counts = Counter(hint(guess, k) for k in consistent if k not in played)
+    counts[game.space.encode_hint(game.N_SLOTS, 0)] = int(guess in consistent)
+    return counts
+
+
+def incoherent_hints(game: MasterMind) -> list:
+    counts = reference_counts(game)
+    return [
+        (black, white)
+        for black in range(game.N_SLOTS + 1)
+        for white in range(game.N_SLOTS + 1 - black)
+        if (game.space.whites or not white) and not counts[game.space.encode_hint(black, white)]
+        ]
+
+
+@pytest.mark.parametrize('variant', ['classic', 'no_repeat', 'black_only'])
+@pytest.mark.parametrize('strategy', ['random', 'minimax'])
+def test_partition_counts_match_reference(variant, strategy):
+    game = MasterMind(4, 6, strategy=strategy, rng=3, variant=variant)
+    while not game.success:
+        game.agent_guess()
+        counts = reference_counts(game)
+        partition = game.hint_partition()
+        assert partition.counts.tolist() == [counts[h] for h in range(game.space.n_hints)]
+        for black in range(game.N_SLOTS + 1):
+            for white in range(game.N_SLOTS + 1 - black):
+                assert game.is_coherent((black, white)) == bool(counts[game.space.encode_hint(black, white)])
+        hint = game.get_hint(game.last_guess)
+        if hint[0] == game.N_SLOTS:
+            game.success = True
+        else:
+            game.apply_feedback(game.last_guess, hint)
+
+
+# every black count is coherent for a black_only opening guess
+@pytest.mark.parametrize('variant', ['classic', 'no_repeat'])
+@pytest.mark.parametrize('scan', [False, True])
+def test_incoherent_hints_are_rejected_before_pruning(monkeypatch, variant, scan):
+    if scan:
+        # too large a space for a partition: hints are checked by scanning it
+        monkeypatch.setattr(mastermind, 'MAX_PARTITION_CODES', 0)
+    game = MasterMind(4, 6, rng=5, variant=variant)
+    for _ in range(2):
+        game.agent_guess()
+        survivors, n_candidates = game.survivors, game.n_candidates
+        before = None if survivors is None else survivors.copy()
+        hints = incoherent_hints(game)
+        assert hints
+        for hint in hints:
+            assert not game.is_coherent(hint)
+        assert (game._scanned is not None) == (scan and survivors is None)
+        assert game.survivors is survivors and game.n_candidates == n_candidates
+        assert before is None or (game.survivors == before).all()
+        game.apply_feedback(game.last_guess, game.get_hint(game.last_guess))
+
+
+def test_scanned_codes_are_handed_to_apply_feedback(monkeypatch):
+    monkeypatch.setattr(mastermind, 'MAX_PARTITION_CODES', 0)
+    game = MasterMind(4, 6, rng=7)
+    game.agent_guess()
+    hint = game.get_hint(game.last_guess)
+    assert game.is_coherent(incoherent_hints(game)[0]) is False
+    assert game.is_coherent(hint)
+    scanned = game._scanned[2]
+    monkeypatch.setattr(game, '_scan', lambda *args: pytest.fail('the space is scanned twice'))
+    game.apply_feedback(game.last_guess, hint)
+    assert game.survivors is scanned and game._scanned is None
+    guess = game.space.index(game.last_guess)
+    expected = [
+        k for k in range(game.space.n_codes)
+        if k != guess and game.space.encode_hint(*reference_hint(game.last_guess, game.space.decode(k))) == game.turns[-1].hint
+        ]
+    assert game.survivors.tolist() == expected
+    assert game.n_candidates == len(expected)
@@ -0,0 +1,71 @@
+from mastermind.core.registry import GameRegistry
+
+
+class Clock:
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_sessions_own_their_games():
+    registry = GameRegistry(clock=Clock())
+    game = registry.get('a', 4, 6)
+    assert registry.get('a', 4, 6) is game
+    assert registry.get('b', 4, 6) is not game
+    assert registry.get('a', 4, 6, 'no_repeat') is not game
+    assert registry.get('c', 4, 6, create=False) is None
+    registry.reset('a')
+    assert 'a' not in registry and 'b' in registry
+    assert registry.get('a', 4, 6) is not game
+
+
+def test_bytes_follow_the_games():
+    registry = GameRegistry(clock=Clock())
+    game = registry.get('a', 4, 6)
+    assert registry.nbytes == game.nbytes
+    game.agent_guess()
+    game.apply_feedback(game.last_guess, game.get_hint(game.last_guess))
+    registry.touch('a', 4, 6)
+    assert registry.nbytes == game.nbytes
+    registry.get('b', 4, 6)
+    registry.reset('a')
+    registry.reset('b')
+    assert len(registry) == 0 and registry.nbytes == 0
+
+
+def test_idle_games_expire():
+    clock = Clock()
+    registry = GameRegistry(max_idle=10, clock=clock)
+    game = registry.get('a', 4, 6)
+    registry.get('b', 4, 6)
+    clock.now = 8
+    registry.touch('a', 4, 6)
+    clock.now = 15
+    assert registry.expire() == 1
+    assert 'a' in registry and 'b' not in registry
+    clock.now = 30
+    # an expired game is replaced by a new one on the next access
+    fresh = registry.get('a', 4, 6)
+    assert fresh is not game and fresh.user_code is None and not fresh.turns
+    assert registry.nbytes == fresh.nbytes
+
+
+def test_least_recently_used_games_are_evicted():
+    clock = Clock()
+    probe = GameRegistry(clock=clock)
+    size = probe.get('probe', 4, 6).nbytes
+    registry = GameRegistry(max_bytes=3*size, clock=clock)
+    for session in 'abc':
+        registry.get(session, 4, 6)
+        clock.now += 1
+    registry.get('a', 4, 6)
+    registry.get('d', 4, 6)
+    assert 'b' not in registry
+    assert all(session in registry for session in 'acd')
+    assert registry.nbytes <= registry.max_bytes
+    # the requested game is kept even alone above the bound
+    tiny = GameRegistry(max_bytes=1, clock=clock)
+    assert tiny.get('a', 4, 6) is not None and 'a' in tiny
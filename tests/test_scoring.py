@@ -0,0 +1,39 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from mastermind.core.scoring import VARIANTS, code_space, score
+
+
+def reference_hint(guess: tuple, code: tuple, whites: bool = True) -> tuple:
+    black = sum(g == c for g, c in zip(guess, code))
+    common = sum(min(guess.count(color), code.count(color)) for color in set(guess))
+    return black, common - black if whites else 0
+
+
+@pytest.mark.parametrize('N_SLOTS, N_COLORS', [(3, 3), (3, 5), (4, 6)])
+def test_permutation_space_follows_itertools_order(N_SLOTS, N_COLORS):
+    space = code_space(N_SLOTS, N_COLORS, 'no_repeat')
+    codes = list(itertools.permutations(range(N_COLORS), N_SLOTS))
+    assert len(space) == len(codes)
+    assert [space.decode(k) for k in range(len(codes))] == codes
+    assert [space.index(code) for code in codes] == list(range(len(codes)))
+    assert (space.index_many(codes) == np.arange(len(codes))).all()
+    assert (space.digits(slice(None)).T == np.array(codes)).all()
+    indices = np.random.default_rng(0).permutation(len(codes))[:50]
+    assert (space.decode_many(indices) == np.array(codes)[indices]).all()
+
+
+@pytest.mark.parametrize('variant', list(VARIANTS))
+def test_kernel_matches_reference(variant):
+    space = code_space(4, 6, variant)
+    codes = [space.decode(k) for k in range(space.n_codes)]
+    rng = np.random.default_rng(1)
+    guesses, candidates = rng.integers(space.n_codes, size=20), rng.integers(space.n_codes, size=200)
+    expected = np.array([
+        [space.encode_hint(*reference_hint(codes[g], codes[c], space.whites)) for c in candidates]
+        for g in guesses
+        ])
+    assert (score(space.digits(guesses), space.digits(candidates), space.N_COLORS, space.whites) == expected).all()
+    assert (space.hint_matrix(guesses, candidates) == expected).all()
@@ -0,0 +1,36 @@
+import pytest
+
+from mastermind.core.mastermind import PENDING_HINT, MasterMind
+
+
+def play(game: MasterMind, turns: int) -> None:
+    for _ in range(turns):
+        if game.success:
+            return
+        game.agent_guess()
+        hint = game.get_hint(game.last_guess)
+        if hint[0] == game.N_SLOTS:
+            game.success = True
+        else:
+            game.apply_feedback(game.last_guess, hint)
+
+
+@pytest.mark.parametrize('variant', ['classic', 'no_repeat', 'bulls_cows', 'black_only'])
+@pytest.mark.parametrize('turns', [0, 1, 3])
+def test_round_trip(variant, turns):
+    game = MasterMind(4, 6, strategy='random', rng=turns, variant=variant)
+    play(game, turns)
+    game.agent_guess()
+    restored = MasterMind.from_bytes(game.to_bytes())
+    assert restored.variant == variant
+    assert list(restored.candidate_indices()) == list(game.candidate_indices())
+    assert [(t.code, t.hint) for t in restored.turns] == [(t.code, t.hint) for t in game.turns]
+    assert restored.turns[-1].hint == PENDING_HINT
+    assert (restored.secret_code, restored.trials, restored.success) == (game.secret_code, game.trials, game.success)
+
+
+def test_short_buffer_is_rejected():
+    game = MasterMind(4, 6, rng=0)
+    play(game, 2)
+    with pytest.raises(ValueError):
+        game.to_bytes(bytearray(game.snapshot_size() - 1))
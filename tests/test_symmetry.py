@@ -0,0 +1,63 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from mastermind.core import strategies
+from mastermind.core.scoring import code_space
+from mastermind.core.strategies import best_guess, minimax_score
+from mastermind.core.symmetry import representatives
+
+
+def brute_force_representatives(space, pool, history):
+    """Lowest index of every orbit of the pool, under the group tracked by `symmetry`: permutations of
+    positions holding the same color in every played guess, times permutations of the unplayed colors."""
+    codes = [space.decode(k) for k in range(space.n_codes)]
+    played = [codes[k] for k in history]
+    played_colors = {color for code in played for color in code}
+    group = [
+        (positions, colors)
+        for positions in itertools.permutations(range(space.N_SLOTS))
+        for colors in itertools.permutations(range(space.N_COLORS))
+        if all(code[positions[p]] == code[p] for code in played for p in range(space.N_SLOTS))
+        and all(colors[color] == color for color in played_colors)
+        ]
+    pool = set(int(k) for k in pool)
+    return sorted(
+        k for k in pool
+        if k == min(space.index(tuple(colors[codes[k][p]] for p in positions)) for positions, colors in group)
+        )
+
+
+@pytest.mark.parametrize('variant', ['classic', 'no_repeat'])
+@pytest.mark.parametrize('history', [(), (0,), (5,), (0, 13)])
+def test_representatives_match_brute_force_orbits(variant, history):
+    space = code_space(3, 4, variant)
+    history = [k for k in history if k < space.n_codes]
+    pool = np.arange(space.n_codes)
+    assert representatives(space, pool, history).tolist() == brute_force_representatives(space, pool, history)
+
+
+@pytest.mark.parametrize('variant', ['classic', 'no_repeat', 'black_only'])
+def test_representatives_never_change_best_guess(monkeypatch, variant):
+    monkeypatch.setattr(strategies, 'MIN_SYMMETRY_PAIRS', 0)
+    space = code_space(4, 5, variant)
+    rng = np.random.default_rng(2)
+    for _ in range(10):
+        secret = int(rng.integers(space.n_codes))
+        candidates, history = np.arange(space.n_codes), []
+        while len(candidates) > 2:
+            guess = best_guess(space, candidates, minimax_score, history=history)
+            assert guess == best_guess(space, candidates, minimax_score)
+            history.append(guess)
+            candidates = candidates[space.hints(guess, candidates) == space.hints(guess, [secret])[0]]
+
+
+@pytest.mark.parametrize('variant', ['classic', 'no_repeat', 'black_only'])
+def test_opening_representatives_are_scored_from_the_openings_table(variant):
+    space = code_space(4, 5, variant)
+    everything = np.arange(space.n_codes)
+    pool = representatives(space, everything, [])
+    for score in (strategies.minimax_score, strategies.max_parts_score, strategies.expected_size_score):
+        assert np.array_equal(strategies.guess_scores(space, pool, everything, score), score(space.partition_counts(pool, everything)))
+    assert space.openings is not None